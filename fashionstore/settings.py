@@ -76,6 +76,8 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'django.template.context_processors.i18n',  # Для i18n
                 'store.context_processors.store_config',  # Конфигурация магазина
+                'store.context_processors.cart_summary',  # Значок корзины в шапке
+                'store.context_processors.page_cache_placeholders',  # Заглушки данных посетителя для кэша страниц
             ],
         },
     },
@@ -95,6 +97,10 @@ DATABASES = {
         'NAME': BASE_DIR / db_config.get('name', 'db.sqlite3'),
     }
 }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Тестовая БД в файле, а не в памяти: в общей БД в памяти параллельные писатели получают
+    # "database table is locked" без ожидания (тест конкурентного add_item в store/tests.py)
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
 
 # Если указаны дополнительные параметры для БД (PostgreSQL, MySQL и т.д.)
 if db_config.get('user'):
@@ -191,6 +197,19 @@ MEDIA_ROOT = os.path.join(BASE_DIR, media_config.get('root', 'media'))
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Кэш конфигурации магазина (store.config_loader)
+# Как часто (в секундах) каждый воркер сверяет свой снимок с общей версией в БД; 0 - на каждый запрос
+config_cache_config = DJANGO_CONFIG.get('config_cache', {})
+CONFIG_VERSION_CHECK_INTERVAL = config_cache_config.get('check_interval', 5)
+# Фоновый поток, который опрашивает config.json и перечитывает его при изменении
+CONFIG_FILE_WATCHER = config_cache_config.get('watch_file', False)
+CONFIG_FILE_WATCH_INTERVAL = config_cache_config.get('watch_interval', 2.0)
+
+# Кэш страниц витрины для анонимных посетителей (store.page_cache); timeout - в секундах
+page_cache_config = DJANGO_CONFIG.get('page_cache', {})
+PAGE_CACHE_ENABLED = page_cache_config.get('enabled', True)
+PAGE_CACHE_TIMEOUT = page_cache_config.get('timeout', 600)
+
 # REST Framework settings
 # Можно переопределить через config.json
 rest_config = DJANGO_CONFIG.get('rest_framework', {})
@@ -204,6 +223,9 @@ REST_FRAMEWORK = {
         'rest_framework.parsers.JSONParser',
     ],
 }
+# Быстрые сериализаторы (store/fast_serializers.py) по эндпоинтам, например {"products": false};
+# не указанные эндпоинты используют значения по умолчанию (включены)
+API_FAST_SERIALIZERS = rest_config.get('fast_serializers', {})
 
 # CORS settings
 # Можно переопределить через config.json
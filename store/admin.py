@@ -9,6 +9,7 @@ from .models import (
     StoreConfig, ContactConfig, SocialConfig, HeroConfig, Feature, AboutConfig, SEOConfig, ThemeConfig,
     ProductFeatureConfig, AboutStat, TelegramConfig, ContactMessage, FAQ
 )
+from .facets import parse_sizes
 
 
 class ProductAdminForm(forms.ModelForm):
@@ -34,16 +35,16 @@ class ProductAdminForm(forms.ModelForm):
         if self.instance and self.instance.pk:
             # Если товар существует, загружаем текущие размеры
             if self.instance.available_sizes:
-                sizes = [s.strip() for s in self.instance.available_sizes.split(',') if s.strip()]
-                self.fields['available_sizes_multiple'].initial = sizes
+                self.fields['available_sizes_multiple'].initial = parse_sizes(self.instance.available_sizes)
         else:
             # По умолчанию выбран M
             self.fields['available_sizes_multiple'].initial = ['M']
     
     def save(self, commit=True):
         instance = super().save(commit=False)
-        # Сохраняем выбранные размеры через запятую
-        selected_sizes = self.cleaned_data.get('available_sizes_multiple', [])
+        # Сохраняем выбранные размеры через запятую в порядке SIZE_CHOICES;
+        # нормализованные ProductFacet обновляются сигналом post_save товара
+        selected_sizes = parse_sizes(', '.join(self.cleaned_data.get('available_sizes_multiple', [])))
         instance.available_sizes = ', '.join(selected_sizes) if selected_sizes else 'M'
         if commit:
             instance.save()
@@ -111,7 +112,7 @@ class ProductAdmin(TabbedTranslationAdmin):
     list_filter = ['category', 'is_active', 'created_at', 'rating']
     search_fields = ['name', 'description', 'available_colors']
     prepopulated_fields = {'slug': ('name',)}
-    readonly_fields = ['created_at', 'updated_at', 'image_preview', 'image_url_preview', 'discount_percent', 'colors_help', 'sizes_help']
+    readonly_fields = ['created_at', 'updated_at', 'image_preview', 'image_url_preview', 'discount_percent', 'colors_help', 'sizes_help', 'popularity_score']
     inlines = [ProductImageInline]
     list_editable = ['is_active', 'stock']
     fieldsets = (
@@ -129,7 +130,7 @@ class ProductAdmin(TabbedTranslationAdmin):
             'description': 'Укажите доступные размеры и цвета для товара'
         }),
         ('Рейтинг', {
-            'fields': ('rating', 'reviews_count')
+            'fields': ('rating', 'reviews_count', 'popularity_score')
         }),
         ('Даты', {
             'fields': ('created_at', 'updated_at'),
@@ -246,15 +247,21 @@ class CartAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Сумма и количество товаров - аннотациями в том же запросе, без загрузки позиций каждой корзины
+        return super().get_queryset(request).with_totals()
+
     def items_count_display(self, obj):
         count = obj.items_count
         url = reverse('admin:store_cartitem_changelist') + f'?cart__id__exact={obj.id}'
         return format_html('<a href="{}">{} товаров</a>', url, count)
     items_count_display.short_description = 'Товаров в корзине'
+    items_count_display.admin_order_field = 'cart_items_count'
 
     def total_display(self, obj):
         return f"{obj.total:,.0f} сум".replace(',', ' ')
     total_display.short_description = 'Итого'
+    total_display.admin_order_field = 'cart_total'
 
 
 @admin.register(CartItem)
@@ -263,6 +270,7 @@ class CartItemAdmin(admin.ModelAdmin):
     list_filter = ['cart', 'created_at', 'product__category']
     search_fields = ['product__name', 'cart__session_key']
     readonly_fields = ['total_display', 'created_at', 'updated_at']
+    list_select_related = ['product', 'cart']
 
     def total_display(self, obj):
         return f"{obj.total:,.0f} сум".replace(',', ' ')
@@ -8,5 +8,11 @@ class StoreConfig(AppConfig):
     def ready(self):
         import store.translation  # Импортируем переводы
         import store.signals  # Импортируем сигналы для уведомлений
+        
+        # Необязательный фоновый наблюдатель за config.json
+        from django.conf import settings
+        if getattr(settings, 'CONFIG_FILE_WATCHER', False):
+            from .config_loader import start_config_file_watcher
+            start_config_file_watcher(getattr(settings, 'CONFIG_FILE_WATCH_INTERVAL', 2.0))
 
 
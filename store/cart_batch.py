@@ -0,0 +1,134 @@
+"""
+Пакетное изменение корзины (/api/cart/batch/): список операций add / update / remove за один запрос
+
+Операции применяются по порядку к позициям, загруженным одним запросом (SELECT ... FOR UPDATE),
+и записываются тремя запросами: DELETE удаленных, bulk_update измененных, bulk_create новых.
+Все в одной транзакции: при ошибке в любой операции корзина не меняется.
+
+Формат:
+    {"operations": [
+        {"op": "add", "product_id": 1, "quantity": 2, "size": "M", "color": ""},
+        {"op": "update", "item_id": 5, "quantity": 3},
+        {"op": "remove", "item_id": 7}
+    ]}
+"""
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from .models import Product, CartItem
+
+MAX_OPERATIONS = 100
+OPERATIONS = ('add', 'update', 'remove')
+
+
+class CartBatchError(ValueError):
+    """Недопустимая операция; index - ее номер в списке, status - HTTP-статус ответа"""
+
+    def __init__(self, message, index=None, status=400):
+        super().__init__(message)
+        self.index = index
+        self.status = status
+
+
+def _positive_int(value, name, index):
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise CartBatchError(f'{name} must be a valid integer', index)
+    if value < 1:
+        raise CartBatchError(f'{name} must be greater than 0', index)
+    return value
+
+
+def parse_operations(data):
+    """Проверяет формат и приводит типы: список словарей {'op', ...}"""
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        raise CartBatchError('operations must be a non-empty list')
+    if len(operations) > MAX_OPERATIONS:
+        raise CartBatchError(f'Too many operations (max {MAX_OPERATIONS})')
+
+    parsed = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get('op') not in OPERATIONS:
+            raise CartBatchError(f'op must be one of: {", ".join(OPERATIONS)}', index)
+        op = operation['op']
+        if op == 'add':
+            parsed.append({
+                'op': op,
+                'product_id': _positive_int(operation.get('product_id'), 'product_id', index),
+                'quantity': _positive_int(operation.get('quantity', 1), 'quantity', index),
+                'size': str(operation.get('size') or ''),
+                'color': str(operation.get('color') or ''),
+            })
+        elif op == 'update':
+            parsed.append({
+                'op': op,
+                'item_id': _positive_int(operation.get('item_id'), 'item_id', index),
+                'quantity': _positive_int(operation.get('quantity'), 'quantity', index),
+            })
+        else:
+            parsed.append({'op': op, 'item_id': _positive_int(operation.get('item_id'), 'item_id', index)})
+    return parsed
+
+
+@transaction.atomic
+def apply_operations(cart, operations):
+    """Применяет операции к корзине (постоянное число запросов при любом количестве операций)"""
+    item_ids = {operation['item_id'] for operation in operations if 'item_id' in operation}
+    product_ids = {operation['product_id'] for operation in operations if operation['op'] == 'add'}
+
+    active_products = set(
+        Product.objects.filter(id__in=product_ids, is_active=True).values_list('id', flat=True)
+    ) if product_ids else set()
+    lines = list(
+        CartItem.objects.select_for_update().filter(cart=cart).filter(
+            Q(id__in=item_ids) | Q(product_id__in=product_ids)
+        )
+    ) if item_ids or product_ids else []
+
+    items = {item.id: item for item in lines}
+    by_key = {(item.product_id, item.size, item.color): item for item in lines}
+    changed, removed, created = set(), set(), []
+
+    for index, operation in enumerate(operations):
+        op = operation['op']
+        if op == 'add':
+            if operation['product_id'] not in active_products:
+                raise CartBatchError(
+                    f'Product with id {operation["product_id"]} not found or is inactive', index, status=404
+                )
+            key = (operation['product_id'], operation['size'], operation['color'])
+            item = by_key.get(key)
+            if item is None:
+                item = CartItem(
+                    cart=cart, product_id=key[0], size=key[1], color=key[2], quantity=operation['quantity']
+                )
+                by_key[key] = item
+                created.append(item)
+            else:
+                item.quantity += operation['quantity']
+                if item.pk is not None:
+                    changed.add(item.pk)
+            continue
+
+        item = items.get(operation['item_id'])
+        if item is None or item.pk in removed:
+            raise CartBatchError(f'Cart item with id {operation["item_id"]} not found', index, status=404)
+        if op == 'update':
+            item.quantity = operation['quantity']
+            changed.add(item.pk)
+        else:
+            removed.add(item.pk)
+            changed.discard(item.pk)
+            by_key.pop((item.product_id, item.size, item.color), None)
+
+    now = timezone.now()
+    if removed:
+        CartItem.objects.filter(cart=cart, id__in=removed).delete()
+    if changed:
+        for pk in changed:
+            items[pk].updated_at = now
+        CartItem.objects.bulk_update([items[pk] for pk in changed], ['quantity', 'updated_at'])
+    if created:
+        CartItem.objects.bulk_create(created)
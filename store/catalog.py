@@ -0,0 +1,244 @@
+"""
+Общая логика каталога для API (ProductViewSet) и HTML-страницы (catalog):
+разбор фильтров из параметров запроса, применение фильтров и подсчет фасетов.
+"""
+import hashlib
+import json
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from django.utils import translation
+from .facets import SIZE_CODES, filter_by_size, filter_by_color, normalize_size, normalize_color
+from .models import Category, Product, ProductFacet
+from .search import search_products, is_ranked
+
+# Диапазоны цен для фильтра в боковой панели каталога (min включительно, max не включительно; None - без границы)
+PRICE_BUCKETS = getattr(settings, 'CATALOG_PRICE_BUCKETS', [
+    (0, 250000),
+    (250000, 500000),
+    (500000, 1000000),
+    (1000000, 2000000),
+])
+
+FACETS_CACHE_TIMEOUT = getattr(settings, 'CATALOG_FACETS_CACHE_TIMEOUT', 300)
+FACETS_VERSION_KEY = 'catalog_facets_version'
+
+# Поддерживаемые сортировки. Каждая совпадает с частичным индексом по активным товарам
+# (см. Product.Meta.indexes) и заканчивается id, чтобы порядок был стабильным.
+SORT_ORDERINGS = {
+    'newest': ('-created_at', '-id'),
+    'popularity': ('-popularity_score', '-id'),  # см. popularity.py
+    'price_low': ('price', 'id'),
+    'price_high': ('-price', '-id'),  # обратный проход индекса price_low
+}
+DEFAULT_SORT = 'newest'
+# При поиске без явной сортировки - по релевантности
+RELEVANCE_ORDERING = ('-search_rank', '-created_at', '-id')
+
+# Старые значения ?ordering= в API (имена полей) -> режим сортировки с тем же направлением.
+# created_at (сначала старые) не поддерживается: такого индекса нет, значение отклоняется с 400
+SORT_ALIASES = {
+    '-created_at': 'newest',
+    '-rating': 'popularity',
+    'price': 'price_low',
+    '-price': 'price_high',
+}
+
+
+class InvalidSort(ValueError):
+    """Неизвестный режим сортировки"""
+
+
+def _parse_price(value):
+    """Цена из параметра запроса или None, если значение некорректно"""
+    if value in (None, ''):
+        return None
+    try:
+        price = Decimal(str(value))
+    except (InvalidOperation, ValueError, TypeError):
+        return None
+    return price if price.is_finite() else None
+
+
+def parse_filters(params):
+    """
+    Нормализует фильтры из GET-параметров (request.GET или request.query_params).
+    Пустые и некорректные значения отбрасываются.
+    """
+    filters = {}
+    category = (params.get('category') or '').strip()
+    if category:
+        filters['category'] = category
+    for key in ('min_price', 'max_price'):
+        price = _parse_price(params.get(key))
+        if price is not None:
+            filters[key] = price
+    search = (params.get('search') or '').strip()
+    if search:
+        filters['search'] = search
+    size = params.get('size')
+    if size:
+        # Неизвестный размер оставляем как есть: filter_by_size вернет пустой результат
+        filters['size'] = normalize_size(size) or size.strip().upper()
+    color = normalize_color(params.get('color'))
+    if color:
+        filters['color'] = color
+    return filters
+
+
+def apply_filters(queryset, filters):
+    """Применяет нормализованные фильтры к queryset товаров"""
+    if 'category' in filters:
+        queryset = queryset.filter(category__slug=filters['category'])
+    if 'min_price' in filters:
+        queryset = queryset.filter(price__gte=filters['min_price'])
+    if 'max_price' in filters:
+        queryset = queryset.filter(price__lte=filters['max_price'])
+    if 'size' in filters:
+        queryset = filter_by_size(queryset, filters['size'])
+    if 'color' in filters:
+        queryset = filter_by_color(queryset, filters['color'])
+    if 'search' in filters:
+        queryset = search_products(queryset, filters['search'])
+    return queryset
+
+
+def get_sort(params, param='sort'):
+    """
+    Режим сортировки из GET-параметров или None, если сортировка не указана.
+    Неизвестное значение - InvalidSort.
+    """
+    value = (params.get(param) or '').strip()
+    if not value:
+        return None
+    value = SORT_ALIASES.get(value, value)
+    if value not in SORT_ORDERINGS:
+        raise InvalidSort(value)
+    return value
+
+
+def apply_sort(queryset, sort=None):
+    """
+    Сортирует товары по режиму из SORT_ORDERINGS.
+    Без режима: по релевантности, если queryset отфильтрован поиском, иначе по новизне.
+    """
+    if sort is None:
+        if is_ranked(queryset):
+            return queryset.order_by(*RELEVANCE_ORDERING)
+        sort = DEFAULT_SORT
+    if sort not in SORT_ORDERINGS:
+        raise InvalidSort(sort)
+    return queryset.order_by(*SORT_ORDERINGS[sort])
+
+
+def filters_cache_key(filters):
+    """Стабильный ключ набора фильтров (не зависит от порядка и формы записи параметров)"""
+    normalized = json.dumps({key: str(value) for key, value in filters.items()}, sort_keys=True)
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+
+def _bump_facets_version():
+    if cache.add(FACETS_VERSION_KEY, 1, None):
+        return
+    try:
+        cache.incr(FACETS_VERSION_KEY)
+    except ValueError:
+        cache.set(FACETS_VERSION_KEY, 1, None)
+
+
+def bump_facets_version(**kwargs):
+    """
+    Инвалидирует кэш фасетов (вызывается сигналами при изменении товаров и категорий).
+    Версия увеличивается после коммита, иначе счетчики могут пересчитаться по старым данным
+    и закэшироваться под новой версией.
+    """
+    transaction.on_commit(_bump_facets_version)
+
+
+# Измерения фасетов и ключи фильтров, которые их сужают
+FACET_FILTER_KEYS = {
+    'category': ('category',),
+    'price': ('min_price', 'max_price'),
+    'size': ('size',),
+    'color': ('color',),
+}
+
+
+def _facet_aggregates(dimension, categories):
+    """Условные агрегаты одного измерения: {имя: Count(...)}"""
+    aggregates = {}
+    if dimension == 'category':
+        for category in categories:
+            aggregates[f'category_{category.id}'] = Count('id', filter=Q(category_id=category.id))
+    elif dimension == 'price':
+        for index, (low, high) in enumerate(PRICE_BUCKETS):
+            condition = Q()
+            if low is not None:
+                condition &= Q(price__gte=low)
+            if high is not None:
+                condition &= Q(price__lt=high)
+            aggregates[f'price_{index}'] = Count('id', filter=condition)
+    else:
+        kind = ProductFacet.KIND_SIZE if dimension == 'size' else ProductFacet.KIND_COLOR
+        codes = SIZE_CODES if dimension == 'size' else [c for c, _ in Product.COLOR_CHOICES]
+        for code in codes:
+            has_value = Exists(ProductFacet.objects.filter(product=OuterRef('pk'), kind=kind, value=code))
+            aggregates[f'{kind}_{code}'] = Count('id', filter=Q(has_value))
+    return aggregates
+
+
+def _compute_facet_counts(filters):
+    """
+    Считает фасеты условной агрегацией: количество товаров по категориям, размерам, цветам и диапазонам цен.
+    Каждое измерение считается без собственного фильтра (выбранный размер не обнуляет остальные размеры),
+    но со всеми остальными. Измерения без своего фильтра считаются одним общим запросом вместе с total,
+    для каждого выбранного измерения - еще один запрос.
+    """
+    categories = list(Category.objects.order_by('name').only('id', 'slug', 'name'))
+    base = Product.objects.filter(is_active=True)
+
+    aggregates = {'total': Count('id')}
+    counts = {}
+    for dimension, keys in FACET_FILTER_KEYS.items():
+        if any(key in filters for key in keys):
+            own_filters = {key: value for key, value in filters.items() if key not in keys}
+            counts.update(apply_filters(base, own_filters).aggregate(**_facet_aggregates(dimension, categories)))
+        else:
+            aggregates.update(_facet_aggregates(dimension, categories))
+    counts.update(apply_filters(base, filters).aggregate(**aggregates))
+
+    return {
+        'total': counts['total'],
+        'categories': [
+            {'slug': category.slug, 'name': category.name, 'count': counts[f'category_{category.id}']}
+            for category in categories
+        ],
+        'sizes': [
+            {'value': code, 'count': counts[f'size_{code}']}
+            for code in SIZE_CODES
+        ],
+        'colors': [
+            {'value': code, 'name': label, 'count': counts[f'color_{code}']}
+            for code, label in Product.COLOR_CHOICES
+        ],
+        'price_buckets': [
+            {'min': low, 'max': high, 'count': counts[f'price_{index}']}
+            for index, (low, high) in enumerate(PRICE_BUCKETS)
+        ],
+    }
+
+
+def get_facet_counts(filters):
+    """
+    Фасеты для набора фильтров с кэшированием по нормализованному ключу.
+    Кэш сбрасывается при изменении товаров или категорий (версия в FACETS_VERSION_KEY).
+    """
+    version = cache.get(FACETS_VERSION_KEY, 0)
+    key = f'catalog_facets:{version}:{translation.get_language()}:{filters_cache_key(filters)}'
+    result = cache.get(key)
+    if result is None:
+        result = _compute_facet_counts(filters)
+        cache.set(key, result, FACETS_CACHE_TIMEOUT)
+    return result
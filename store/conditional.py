@@ -0,0 +1,130 @@
+"""
+Условные GET-запросы (ETag / Last-Modified) для каталога, страниц товаров и API товаров и категорий
+
+Валидаторы не сканируют таблицы:
+- списки (API товаров и категорий, страница каталога) - версия каталога: счетчик ConfigVersion с ключом
+  CATALOG_VERSION_KEY, который увеличивается после коммита при любом изменении товаров, категорий, изображений,
+  похожих товаров и популярности (сигналы, build_related_products, refresh_popularity);
+- товар (API и страница) - строка самого товара, его изображения и его строки RelatedProduct
+  (чтения по индексам), поэтому изменение одного товара не сбрасывает ETag остальных;
+- для HTML к ним добавляется общая версия конфигурации (шапка и подвал), CSRF-cookie посетителя
+  и количество товаров в его корзине: в странице зашиты CSRF-токен и значок корзины.
+При совпадении с If-None-Match / If-Modified-Since ответ 304 отдается до сериализации и рендера.
+
+Last-Modified отдается только там, где он надежен: время последнего увеличения версии каталога
+(удаление и bulk_update тоже его меняют). У товара и у HTML-страниц Last-Modified нет - только ETag.
+"""
+import hashlib
+from functools import wraps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.utils.translation import get_language
+from .models import Product, ProductImage, RelatedProduct, Cart, ConfigVersion
+
+CATALOG_VERSION_KEY = 'catalog'
+
+
+def invalidate_catalog_version(sender=None, **kwargs):
+    """Обработчик post_save/post_delete (и прямой вызов): увеличивает версию каталога после коммита"""
+    transaction.on_commit(lambda: ConfigVersion.bump(CATALOG_VERSION_KEY))
+
+
+def catalog_state():
+    """Состояние каталога: (время изменения версии, версия) одним чтением по уникальному индексу"""
+    version, updated = ConfigVersion.get_state(CATALOG_VERSION_KEY)
+    return updated, version
+
+
+def product_state(slug):
+    """
+    Отпечаток одного товара без даты: строка товара (с категорией), его изображения и похожие товары.
+    Дата изменения товара ненадежна (popularity_score пишется через bulk_update), поэтому только ETag.
+    """
+    row = Product.objects.filter(slug=slug).values_list(
+        'id', 'is_active', 'updated_at', 'popularity_score', 'category__updated_at'
+    ).first()
+    if row is None:
+        # Товара нет: страница строится из заглушек конфигурации или это 404
+        return None, None
+    images = ProductImage.objects.filter(product_id=row[0]).aggregate(last=Max('id'), count=Count('id'))
+    links = RelatedProduct.objects.filter(product_id=row[0]).aggregate(
+        last=Max('id'), count=Count('id'), updated=Max('related__updated_at')
+    )
+    fingerprint = [row, images['count'], images['last'], links['count'], links['last'], links['updated']]
+    if not links['count']:
+        # Похожих еще нет: выводятся популярные товары категории, они зависят от всего каталога
+        fingerprint.append(catalog_state()[1])
+    return None, tuple(fingerprint)
+
+
+def make_validators(request, *states, html=False):
+    """
+    (ETag, Last-Modified) по состояниям (дата, отпечаток) для текущего URL и языка.
+    html=True - добавляет версию конфигурации (шапка и подвал), CSRF-cookie посетителя и количество товаров
+    в его корзине (без сессии - без запроса к БД), Last-Modified не отдается.
+    """
+    parts = [request.get_full_path(), get_language()]
+    parts.extend(fingerprint for _, fingerprint in states)
+    if html:
+        parts.append(ConfigVersion.get_version())
+        parts.append(request.COOKIES.get(settings.CSRF_COOKIE_NAME, ''))
+        parts.append(Cart.get_summary(request.session)['items_count'])
+    etag = hashlib.md5(repr(parts).encode('utf-8')).hexdigest()
+    dates = [updated for updated, _ in states if updated is not None]
+    if html or len(dates) != len(states):
+        return etag, None
+    return etag, (max(dates) if dates else None)
+
+
+def conditional(get_validators):
+    """
+    Декоратор view (как django.views.decorators.http.condition, но ETag и Last-Modified считаются одной
+    функцией, без повторных запросов): get_validators(request, *args, **kwargs) -> (etag, last_modified).
+    Для методов ViewSet используется через method_decorator.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            etag, last_modified = get_validators(request, *args, **kwargs)
+            timestamp = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=quote_etag(etag), last_modified=timestamp)
+            if response is not None:
+                return response
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200:
+                response.headers.setdefault('ETag', quote_etag(etag))
+                if timestamp is not None:
+                    response.headers.setdefault('Last-Modified', http_date(timestamp))
+            return response
+        return wrapper
+    return decorator
+
+
+def product_list_validators(request, *args, **kwargs):
+    """GET /api/products/: фильтры, сортировка и страница входят в URL, данные - в версию каталога"""
+    return make_validators(request, catalog_state())
+
+
+def product_detail_validators(request, slug=None, *args, **kwargs):
+    """GET /api/products/{slug}/"""
+    return make_validators(request, product_state(slug))
+
+
+def category_validators(request, *args, **kwargs):
+    """GET /api/categories/ и /api/categories/{slug}/"""
+    return make_validators(request, catalog_state())
+
+
+def catalog_page_validators(request, *args, **kwargs):
+    """Страница каталога: товары, категории и фасеты"""
+    return make_validators(request, catalog_state(), html=True)
+
+
+def product_page_validators(request, slug=None, *args, **kwargs):
+    """Страница товара: сам товар, его изображения и похожие товары (без сканирования таблиц)"""
+    return make_validators(request, product_state(slug), html=True)
@@ -3,10 +3,18 @@
 """
 import json
 import os
+import tempfile
+import threading
+import time
 from pathlib import Path
+from types import MappingProxyType
 
 # Используем BASE_DIR напрямую, чтобы избежать циклических импортов
 BASE_DIR = Path(__file__).resolve().parent.parent
+CONFIG_PATH = BASE_DIR / 'config.json'
+
+# Отметка текущего потока: конфигурация собрана из config.json из-за ошибки БД (см. _build_snapshot)
+_load_state = threading.local()
 
 
 def load_config_from_models():
@@ -175,7 +183,9 @@ def load_config_from_models():
         return config if config else None
             
     except Exception as e:
-        # Если таблицы еще не созданы или другая ошибка, используем config.json как заглушку
+        # Если таблицы еще не созданы или другая ошибка, используем config.json как заглушку.
+        # Ошибка может быть временной: такой результат не попадает в снимок процесса
+        _load_state.fallback = True
         file_config = load_config_from_file()
         if file_config:
             return file_config
@@ -199,22 +209,104 @@ def load_config_from_db():
     return None
 
 
+# Кэш разобранного config.json: (сигнатура файла, данные).
+# Сигнатура - (inode, mtime, размер); файл разбирается заново только если она изменилась.
+_file_cache = None
+_file_lock = threading.Lock()
+_file_watcher = None
+_watcher_lock = threading.Lock()  # отдельно от _file_lock: запуск наблюдателя читает файл
+
+
+def _file_signature(path):
+    """Возвращает (inode, mtime_ns, size) файла или None, если файла нет"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+
 def load_config_from_file():
     """
-    Загружает конфигурацию из config.json
+    Загружает конфигурацию из config.json.
+    Результат кэшируется по сигнатуре файла и разделяется между вызовами - не изменяйте его.
     """
-    config_path = BASE_DIR / 'config.json'
-    
-    if not config_path.exists():
+    global _file_cache
+    signature = _file_signature(CONFIG_PATH)
+    if signature is None:
         return None
     
+    cached = _file_cache
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+    
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
             config = json.load(f)
-        return config
     except (json.JSONDecodeError, IOError) as e:
         print(f"Error loading config.json: {e}")
         return None
+    
+    with _file_lock:
+        _file_cache = (signature, config)
+    return config
+
+
+def config_file_changed():
+    """
+    Проверяет, изменился ли config.json с момента последнего разбора (один stat без чтения файла)
+    """
+    cached = _file_cache
+    return cached is not None and _file_signature(CONFIG_PATH) != cached[0]
+
+
+def write_config_file(data):
+    """
+    Атомарно записывает config.json: во временный файл рядом и затем rename.
+    Читатели видят либо старый, либо новый файл целиком, но никогда недописанный.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=CONFIG_PATH.parent, prefix='.config.', suffix='.json.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, CONFIG_PATH)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _watch_config_file(interval):
+    """Цикл фонового наблюдателя: перечитывает config.json при изменении и сбрасывает снимок"""
+    while True:
+        time.sleep(interval)
+        try:
+            if config_file_changed():
+                load_config_from_file()
+                _invalidate_local()
+        except Exception as e:
+            print(f"Error watching config.json: {e}")
+
+
+def start_config_file_watcher(interval=2.0):
+    """
+    Запускает (один раз на процесс) фоновый поток, который опрашивает config.json
+    и заранее перечитывает его при изменении
+    """
+    global _file_watcher
+    # Прогрев кэша - вне блокировок: load_config_from_file сам берет _file_lock
+    load_config_from_file()
+    with _watcher_lock:
+        if _file_watcher is not None:
+            return _file_watcher
+        _file_watcher = threading.Thread(
+            target=_watch_config_file, args=(interval,),
+            name='config-file-watcher', daemon=True
+        )
+        _file_watcher.start()
+    return _file_watcher
 
 
 def load_config():
@@ -288,30 +380,208 @@ def get_default_config():
     }
 
 
-# УБРАЛИ КЭШИРОВНИЕ - данные всегда берутся свежими из БД (админка имеет приоритет)
-# Это гарантирует, что изменения в админке сразу отображаются на сайте
+# Снимок конфигурации внутри процесса.
+# Пересобирается только после изменения моделей конфигурации: сигналы post_save/post_delete
+# (см. signals.py) увеличивают счетчик поколений, и следующий get_config() строит новый снимок.
+# В установившемся режиме рендер страницы не делает ни одного запроса за конфигурацией.
+#
+# Для нескольких воркеров (gunicorn) поколение дополнительно хранится в БД (модель ConfigVersion):
+# каждый воркер не чаще раза в CONFIG_VERSION_CHECK_INTERVAL секунд читает его одним запросом
+# по уникальному индексу и сбрасывает свой снимок, если версию увеличил другой воркер.
+# С той же периодичностью проверяется сигнатура config.json (если не запущен наблюдатель).
+_config_generation = 0
+_config_snapshots = {}  # код языка -> снимок (переводимые поля раскрыты для этого языка)
+_config_lock = threading.Lock()
+_shared_version = None  # последняя увиденная версия из ConfigVersion
+_shared_checked_at = 0.0
+
+
+def _get_check_interval():
+    """Интервал (в секундах) между проверками общей версии конфигурации; 0 - на каждый запрос"""
+    from django.conf import settings
+    return getattr(settings, 'CONFIG_VERSION_CHECK_INTERVAL', 5)
+
+
+def _invalidate_local():
+    """Сбрасывает снимки текущего процесса"""
+    global _config_generation
+    with _config_lock:
+        _config_generation += 1
+        _config_snapshots.clear()
+
+
+def _sync_config_sources():
+    """
+    Сверяет локальное поколение с общей версией в БД и с config.json (не чаще, чем раз в интервал)
+    """
+    global _shared_version, _shared_checked_at
+    now = time.monotonic()
+    if now - _shared_checked_at < _get_check_interval():
+        return
+    _shared_checked_at = now
+
+    if _file_watcher is None and config_file_changed():
+        _invalidate_local()
+
+    try:
+        from .models import ConfigVersion
+        version = ConfigVersion.get_version()
+    except Exception:
+        # Таблица еще не создана (до миграций) - работаем только с локальным поколением
+        return
+
+    if _shared_version is not None and version != _shared_version:
+        _invalidate_local()
+    _shared_version = version
+
+
+def _publish_invalidation():
+    """
+    Сбрасывает локальный снимок и увеличивает общую версию, чтобы остальные воркеры тоже пересобрали свои
+    """
+    global _shared_version
+    _invalidate_local()
+    try:
+        from .models import ConfigVersion
+        _shared_version = ConfigVersion.bump()
+    except Exception:
+        pass
+
+
+def _freeze(value):
+    """
+    Делает конфигурацию неизменяемой: dict -> MappingProxyType, list -> tuple.
+    Снимок разделяется между всеми запросами процесса, поэтому изменять его нельзя.
+    """
+    if isinstance(value, dict):
+        return MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _apps_ready():
+    """
+    Проверяет, загружен ли реестр приложений.
+    До этого (например, при импорте settings) модели недоступны и кэшировать нечего.
+    """
+    try:
+        from django.apps import apps
+        return apps.ready
+    except ImportError:
+        return False
+
+
+def _build_snapshot(generation):
+    """
+    Строит снимок конфигурации: сама конфигурация + активные партнеры и features для шаблонов
+    """
+    from .models import Partner, Feature
+
+    _load_state.fallback = False
+    config = _freeze(load_config())
+    return {
+        'generation': generation,
+        'config': config,
+        'partners': tuple(Partner.objects.filter(is_active=True).order_by('order', 'name')),
+        'features': tuple(Feature.objects.filter(is_active=True).order_by('order', 'title')),
+        # Собран из config.json из-за ошибки БД - не кэшируется, следующий запрос соберет заново
+        'fallback': _load_state.fallback,
+    }
+
+
+def _build_language_snapshots(generation):
+    """
+    Строит снимки сразу для всех языков сайта (settings.LANGUAGES).
+    Переводимые поля (modeltranslation) раскрываются в момент сборки, поэтому
+    у каждого языка свой снимок, и переключение языка не приводит к холодной пересборке.
+    """
+    from django.conf import settings
+    from django.utils import translation
+
+    snapshots = {}
+    for code, _name in settings.LANGUAGES:
+        with translation.override(code):
+            snapshots[code] = _build_snapshot(generation)
+    return snapshots
+
+
+def get_config_snapshot():
+    """
+    Возвращает актуальный снимок конфигурации для текущего языка.
+    Снимок пересобирается, только если счетчик поколений изменился;
+    при пересборке сразу строятся снимки всех языков.
+    """
+    from django.conf import settings
+    from django.utils import translation
+
+    _sync_config_sources()
+
+    language = translation.get_language()
+    generation = _config_generation
+    snapshot = _config_snapshots.get(language)
+    if snapshot is not None and snapshot['generation'] == generation:
+        return snapshot
+
+    # Поколение фиксируем ДО сборки: если во время сборки придет инвалидация,
+    # снимок сразу окажется устаревшим и будет пересобран при следующем обращении
+    if language in dict(settings.LANGUAGES):
+        built = _build_language_snapshots(generation)
+    else:
+        # Язык вне settings.LANGUAGES (например, переводы отключены в management-команде)
+        built = {language: _build_snapshot(generation)}
+
+    with _config_lock:
+        for code, item in built.items():
+            if item['fallback']:
+                continue
+            current = _config_snapshots.get(code)
+            if current is None or current['generation'] <= generation:
+                _config_snapshots[code] = item
+    return built[language]
+
+
+def invalidate_config(**kwargs):
+    """
+    Помечает снимок конфигурации устаревшим во всех воркерах.
+    Сигнатура совместима с обработчиками сигналов Django.
+    """
+    from django.db import transaction
+
+    _invalidate_local()
+    # Общую версию увеличиваем после коммита, иначе другой воркер может
+    # пересобрать снимок по еще не зафиксированным данным
+    transaction.on_commit(_publish_invalidation)
 
 
 def get_config():
     """
-    Получает конфигурацию БЕЗ кэширования - всегда свежие данные из БД
-    Приоритет: админка > config.json (заглушка)
+    Получает конфигурацию из снимка процесса.
+    Приоритет: админка > config.json (заглушка).
+    Изменения в админке сразу видны: сохранение моделей конфигурации инвалидирует снимок.
     """
-    return load_config()
+    if not _apps_ready():
+        # Реестр приложений еще не готов (импорт settings) - читаем напрямую, без кэша
+        return load_config()
+    return get_config_snapshot()['config']
 
 
 def reload_config():
     """
-    Перезагружает конфигурацию (теперь не нужна, так как кэш убран, но оставляем для совместимости)
+    Инвалидирует снимок конфигурации и сразу строит новый
     """
-    # Кэш убран, данные всегда свежие из БД
+    invalidate_config()
     return get_config()
 
 
 def get_django_config():
     """
-    Получает настройки Django из config.json
+    Получает настройки Django из секции django файла config.json.
+    Вызывается из settings.py при старте каждого процесса, поэтому не трогает ORM и модели:
+    только кэшированный разбор файла, а если файла нет - значения по умолчанию.
     """
-    config = get_config()
-    return config.get('django', {})
+    file_config = load_config_from_file()
+    if file_config is None:
+        return get_default_config()['django']
+    return file_config.get('django', {})
 
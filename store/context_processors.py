@@ -1,32 +1,63 @@
 """
 Context processors для передачи конфигурации в шаблоны
 """
-from .config_loader import get_config
-from .models import Partner, Feature
+from django.utils.functional import SimpleLazyObject
+from .config_loader import get_config_snapshot
 
 
 def store_config(request):
     """
-    Передает конфигурацию магазина во все шаблоны
+    Передает конфигурацию магазина во все шаблоны.
+    Значения ленивые: снимок конфигурации запрашивается один раз за рендер и только
+    если шаблон действительно обращается к одной из переменных.
     """
-    config = get_config()
-    # Получаем партнеров из БД вместо конфига
-    partners = Partner.objects.filter(is_active=True).order_by('order', 'name')
-    # Получаем features из БД вместо конфига
-    features = Feature.objects.filter(is_active=True).order_by('order', 'title')
+    snapshot = SimpleLazyObject(get_config_snapshot)
+    
+    def config():
+        return snapshot['config']
+    
+    def section(name):
+        return SimpleLazyObject(lambda: config().get(name, {}))
+    
+    def store_value(key, default):
+        return SimpleLazyObject(lambda: config().get('store', {}).get(key, default))
     
     return {
-        'store_config': config,
-        'store_name': config.get('store', {}).get('name', 'Fashion Store'),
-        'store_title': config.get('store', {}).get('title', 'Fashion Store'),
-        'store_description': config.get('store', {}).get('description', ''),
-        'contact_info': config.get('contact', {}),
-        'social_links': config.get('social', {}),
-        'partners': partners,  # Теперь из БД
-        'features': features,  # Теперь из БД
-        'about_info': config.get('about', {}),
-        'hero_config': config.get('hero', {}),
-        'seo_config': config.get('seo', {}),
-        'theme_config': config.get('theme', {}),
+        'store_config': SimpleLazyObject(config),
+        'store_name': store_value('name', 'Fashion Store'),
+        'store_title': store_value('title', 'Fashion Store'),
+        'store_description': store_value('description', ''),
+        'contact_info': section('contact'),
+        'social_links': section('social'),
+        'partners': SimpleLazyObject(lambda: snapshot['partners']),  # Активные партнеры из БД (в снимке)
+        'features': SimpleLazyObject(lambda: snapshot['features']),  # Активные features из БД (в снимке)
+        'about_info': section('about'),
+        'hero_config': section('hero'),
+        'seo_config': section('seo'),
+        'theme_config': section('theme'),
     }
 
+
+
+def cart_summary(request):
+    """
+    Количество товаров и сумма корзины для значка в шапке (base.html), чтобы страница не запрашивала
+    /api/cart/summary/ после загрузки. Ленивое значение: запрос к БД - только если шаблон его использует
+    и у посетителя есть сессия.
+    """
+    from .models import Cart
+    return {'cart_summary': SimpleLazyObject(lambda: Cart.get_summary(request.session))}
+
+
+def page_cache_placeholders(request):
+    """
+    При рендере страницы для кэша (page_cache.anonymous_page_cache) подменяет данные посетителя заглушками:
+    закэшированный HTML не должен содержать CSRF-токен и корзину конкретного посетителя
+    """
+    if getattr(request, 'page_cache_placeholders', False):
+        from .page_cache import CSRF_PLACEHOLDER, CART_COUNT_PLACEHOLDER
+        return {
+            'csrf_token': CSRF_PLACEHOLDER,
+            'cart_summary': {'items_count': CART_COUNT_PLACEHOLDER},
+        }
+    return {}
@@ -0,0 +1,111 @@
+"""
+Нормализованные фильтры товаров (размеры и цвета) поверх строковых полей
+available_sizes и available_colors.
+
+Строки вида "S, M, L" и "Черный, Белый" разбираются в коды (XS..XXL и ключи Product.COLOR_CHOICES)
+и хранятся в ProductFacet, поэтому фильтр каталога - это равенство по индексу (kind, value),
+и "S" больше не совпадает с "XS" или "XXL".
+"""
+from django.conf import settings
+from .models import Product, ProductFacet
+
+SIZE_CODES = [code for code, _label in Product.SIZE_CHOICES]
+
+# Название цвета (на любом языке) или ключ -> ключ из Product.COLOR_CHOICES
+COLOR_CODES = {}
+for _code, _label in Product.COLOR_CHOICES:
+    COLOR_CODES[_code] = _code
+    COLOR_CODES[_label.lower()] = _code
+
+# HEX-коды из фильтра каталога (templates/catalog.html) -> ключ цвета
+COLOR_HEX_CODES = {
+    '#000': 'black',
+    '#000000': 'black',
+    '#fff': 'white',
+    '#ffffff': 'white',
+    '#e74c3c': 'red',
+    '#3498db': 'blue',
+    '#2ecc71': 'green',
+    '#f39c12': 'yellow',
+    '#f1c40f': 'yellow',
+    '#95a5a6': 'gray',
+}
+
+
+def normalize_size(value):
+    """Код размера (XS..XXL) или None, если значение не из SIZE_CHOICES"""
+    value = (value or '').strip().upper()
+    return value if value in SIZE_CODES else None
+
+
+def normalize_color(value):
+    """Ключ цвета из названия, ключа или HEX-кода; неизвестные названия - в нижнем регистре"""
+    value = (value or '').strip().lower()
+    if not value:
+        return None
+    if value in COLOR_HEX_CODES:
+        return COLOR_HEX_CODES[value]
+    return COLOR_CODES.get(value, value[:50])
+
+
+def parse_sizes(sizes_str):
+    """'S, M, L' -> ['S', 'M', 'L'] (только известные размеры, без повторов)"""
+    result = []
+    for part in (sizes_str or '').split(','):
+        size = normalize_size(part)
+        if size and size not in result:
+            result.append(size)
+    return result
+
+
+def parse_colors(*colors_strs):
+    """'Черный, Белый' (и переводы) -> ['black', 'white'] без повторов"""
+    result = []
+    for colors_str in colors_strs:
+        for part in (colors_str or '').split(','):
+            color = normalize_color(part)
+            if color and color not in result:
+                result.append(color)
+    return result
+
+
+def product_facet_values(product):
+    """Пары (kind, value) для товара; цвета собираются из всех переводов поля"""
+    languages = getattr(settings, 'MODELTRANSLATION_LANGUAGES', ())
+    colors_strs = [getattr(product, f'available_colors_{lang}', None) for lang in languages]
+    if not any(colors_strs):
+        colors_strs = [product.available_colors]
+    values = [(ProductFacet.KIND_SIZE, size) for size in parse_sizes(product.available_sizes)]
+    values += [(ProductFacet.KIND_COLOR, color) for color in parse_colors(*colors_strs)]
+    return values
+
+
+def sync_product_facets(product, facet_model=ProductFacet):
+    """Приводит строки ProductFacet товара в соответствие с его полями"""
+    wanted = set(product_facet_values(product))
+    existing = set(facet_model.objects.filter(product_id=product.pk).values_list('kind', 'value'))
+    stale = existing - wanted
+    if stale:
+        for kind, value in stale:
+            facet_model.objects.filter(product_id=product.pk, kind=kind, value=value).delete()
+    missing = wanted - existing
+    if missing:
+        facet_model.objects.bulk_create([
+            facet_model(product_id=product.pk, kind=kind, value=value) for kind, value in missing
+        ], ignore_conflicts=True)
+
+
+def filter_by_size(queryset, size):
+    """Товары с указанным размером (равенство по индексу)"""
+    code = normalize_size(size)
+    if not code:
+        return queryset.none()
+    return queryset.filter(facets__kind=ProductFacet.KIND_SIZE, facets__value=code)
+
+
+def filter_by_color(queryset, color):
+    """Товары с указанным цветом: принимает ключ, название или HEX-код"""
+    code = normalize_color(color)
+    if not code:
+        return queryset
+    return queryset.filter(facets__kind=ProductFacet.KIND_COLOR, facets__value=code)
@@ -0,0 +1,216 @@
+"""
+Быстрые сериализаторы для горячих read-only эндпоинтов: /api/products/, /api/categories/, /api/cart/current/
+
+Собирают словари напрямую из атрибутов моделей, без интроспекции полей и вызовов to_representation
+ModelSerializer. Форма JSON совпадает с ProductSerializer, CategorySerializer и CartSerializer
+(включая ?fields= / ?expand= и product_fields в корзине). Переводимые поля читаются из колонок
+перевода в порядке fallback modeltranslation, вычисленном один раз на язык.
+
+Включаются отдельно для каждого эндпоинта настройкой API_FAST_SERIALIZERS (см. use_fast_serializer);
+сравнение скорости с DRF - команда serializer_benchmark.
+"""
+from decimal import Decimal
+from functools import lru_cache
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils import timezone
+from django.utils.encoding import filepath_to_uri
+from django.utils.translation import get_language
+from modeltranslation.fields import NONE, TranslationFieldDescriptor
+from modeltranslation.utils import build_localized_fieldname, resolution_order
+from .serializers import ProductSerializer, get_requested_fields
+
+# Эндпоинты с быстрым путем по умолчанию; переопределяется settings.API_FAST_SERIALIZERS
+DEFAULT_FAST_SERIALIZERS = {
+    'products': True,
+    'categories': True,
+    'cart': True,
+}
+
+TWO_PLACES = Decimal('0.01')
+
+
+def use_fast_serializer(endpoint):
+    """Включен ли быстрый сериализатор для эндпоинта ('products', 'categories', 'cart')"""
+    config = getattr(settings, 'API_FAST_SERIALIZERS', None) or {}
+    return config.get(endpoint, DEFAULT_FAST_SERIALIZERS.get(endpoint, False))
+
+
+class Context:
+    """
+    То, что DRF вычисляет заново для каждого поля каждого объекта, вычисляется один раз на ответ:
+    язык, часовой пояс и абсолютный префикс MEDIA_URL.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.language = get_language()
+        self.timezone = timezone.get_current_timezone()
+        self.media_prefix = None
+        if request is not None and isinstance(default_storage, FileSystemStorage):
+            # FileSystemStorage.url() = MEDIA_URL + путь; build_absolute_uri добавляет схему и хост
+            self.media_prefix = request.build_absolute_uri(default_storage.base_url)
+
+
+@lru_cache(maxsize=None)
+def _translation_lookup(model, field, language):
+    """
+    Порядок колонок перевода для поля (как TranslationFieldDescriptor) и "пустое" значение.
+    None - поле не переводимое.
+    """
+    descriptor = model.__dict__.get(field)
+    if not isinstance(descriptor, TranslationFieldDescriptor):
+        return None
+    undefined = descriptor.fallback_undefined
+    if undefined is NONE:
+        undefined = descriptor.field.get_default()
+    names = tuple(build_localized_fieldname(field, lang) for lang in resolution_order(language, descriptor.fallback_languages))
+    return names, undefined
+
+
+def _translated(obj, field, ctx):
+    """Значение переводимого поля на текущем языке с fallback, без вызова дескриптора на каждое поле"""
+    lookup = _translation_lookup(type(obj), field, ctx.language)
+    if lookup is not None:
+        names, undefined = lookup
+        for name in names:
+            value = getattr(obj, name, None)
+            if value is not None and value != undefined:
+                return str(value)
+    # Нет перевода или поле не переводимое: обычный путь (значение по умолчанию / fallback_value)
+    return _text(getattr(obj, field))
+
+
+def _decimal(value):
+    """Как serializers.DecimalField(decimal_places=2): строка с двумя знаками"""
+    if value is None:
+        return None
+    return '{:f}'.format(value.quantize(TWO_PLACES))
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _datetime(value, ctx):
+    """Как serializers.DateTimeField: локальное время текущей зоны в ISO 8601"""
+    if value is None:
+        return None
+    value = value.astimezone(ctx.timezone).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def _file_url(value, ctx):
+    """Как serializers.ImageField: абсолютный URL файла или None"""
+    if not value:
+        return None
+    if ctx.media_prefix is not None and value.storage is default_storage:
+        return ctx.media_prefix + filepath_to_uri(value.name).lstrip('/')
+    try:
+        url = value.url
+    except AttributeError:
+        return None
+    return ctx.request.build_absolute_uri(url) if ctx.request is not None else url
+
+
+def _category(category, ctx):
+    if category is None:
+        return None
+    return {
+        'id': category.id,
+        'name': _translated(category, 'name', ctx),
+        'slug': _text(category.slug),
+        'image': _file_url(category.image, ctx),
+        'description': _translated(category, 'description', ctx),
+    }
+
+
+def serialize_categories(categories, request):
+    """Список категорий в форме CategorySerializer"""
+    ctx = Context(request)
+    return [_category(category, ctx) for category in categories]
+
+
+def _discount_percent(product, ctx):
+    if product.old_price and product.old_price > product.price:
+        return round(((product.old_price - product.price) / product.old_price) * 100, 0)
+    return 0
+
+
+def _image_display(product, ctx):
+    if product.image_url:
+        return product.image_url
+    if product.image:
+        return _file_url(product.image, ctx)
+    return None
+
+
+# Поля ProductSerializer в том же порядке; category_id (write_only) в ответ не попадает
+PRODUCT_FIELDS = (
+    ('id', lambda p, ctx: p.id),
+    ('name', lambda p, ctx: _translated(p, 'name', ctx)),
+    ('slug', lambda p, ctx: _text(p.slug)),
+    ('description', lambda p, ctx: _translated(p, 'description', ctx)),
+    ('price', lambda p, ctx: _decimal(p.price)),
+    ('old_price', lambda p, ctx: _decimal(p.old_price)),
+    ('category', lambda p, ctx: _category(p.category, ctx)),
+    ('image', lambda p, ctx: _file_url(p.image, ctx)),
+    ('image_url', lambda p, ctx: _text(p.image_url)),
+    ('image_display', _image_display),
+    ('available_sizes', lambda p, ctx: _text(p.available_sizes)),
+    ('available_colors', lambda p, ctx: _translated(p, 'available_colors', ctx)),
+    ('stock', lambda p, ctx: p.stock),
+    ('is_active', lambda p, ctx: p.is_active),
+    ('rating', lambda p, ctx: _decimal(p.rating)),
+    ('reviews_count', lambda p, ctx: p.reviews_count),
+    ('images', lambda p, ctx: [{'id': image.id, 'image': _file_url(image.image, ctx)} for image in p.images.all()]),
+    ('discount_percent', _discount_percent),
+    ('created_at', lambda p, ctx: _datetime(p.created_at, ctx)),
+)
+
+
+def get_product_fields(request, fields_param='fields', expand_param='expand'):
+    """Геттеры полей товара с учетом ?fields= / ?expand= (как DynamicFieldsMixin)"""
+    requested = get_requested_fields(request, ProductSerializer.Meta, fields_param, expand_param)
+    if requested is None:
+        return PRODUCT_FIELDS
+    return tuple((name, getter) for name, getter in PRODUCT_FIELDS if name in requested)
+
+
+def serialize_products(products, request, fields=None):
+    """Список товаров в форме ProductSerializer; fields - результат get_product_fields (по умолчанию из запроса)"""
+    if fields is None:
+        fields = get_product_fields(request)
+    ctx = Context(request)
+    return [{name: getter(product, ctx) for name, getter in fields} for product in products]
+
+
+def serialize_cart(cart, request):
+    """
+    Корзина в форме CartSerializer.
+    Ожидает, что cart.items загружены prefetch_related вместе с product, product__category и product__images.
+    """
+    fields = get_product_fields(request, 'product_fields', 'product_expand')
+    ctx = Context(request)
+    items = list(cart.items.all())
+    return {
+        'id': cart.id,
+        'session_key': _text(cart.session_key),
+        'items': [
+            {
+                'id': item.id,
+                'product': {name: getter(item.product, ctx) for name, getter in fields},
+                'quantity': item.quantity,
+                'size': _text(item.size),
+                'color': _text(item.color),
+                'total': item.total,
+            }
+            for item in items
+        ],
+        'total': sum(item.total for item in items),
+        'items_count': sum(item.quantity for item in items),
+        'created_at': _datetime(cart.created_at, ctx),
+        'updated_at': _datetime(cart.updated_at, ctx),
+    }
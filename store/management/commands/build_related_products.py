@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from store.recommendations import RELATED_TOP_K, build_related_products, np
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает похожие товары (RelatedProduct) по совместным покупкам в заказах, '
+        'с дополнением популярными товарами той же категории. Запускайте раз в сутки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=RELATED_TOP_K,
+            help=f'Сколько похожих товаров хранить для каждого товара (по умолчанию: {RELATED_TOP_K})',
+        )
+
+    def handle(self, *args, **options):
+        products, co_purchase, category = build_related_products(top_k=options['top_k'])
+        engine = 'NumPy' if np is not None else 'Python'
+        self.stdout.write(self.style.SUCCESS(
+            f'Похожие товары пересчитаны ({engine}) для {products} товаров: '
+            f'{co_purchase} по совместным покупкам, {category} из той же категории.'
+        ))
@@ -0,0 +1,161 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from store.catalog import SORT_ORDERINGS
+from store.models import Category, Product, Cart, Order
+
+
+# Индексы из миграций 0023_catalog_indexes и 0024_sort_mode_indexes, эффект которых измеряется
+BENCH_INDEXES = {
+    Product: ['store_prod_active_new_idx', 'store_prod_active_pop_idx', 'store_prod_active_price_idx', 'store_prod_active_cat_idx'],
+    Cart: ['store_cart_updated_idx'],
+    Order: ['store_order_session_idx'],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет БД большим каталогом (во временной транзакции, которая откатывается), '
+        'выводит EXPLAIN и время горячих запросов каталога без индексов и с индексами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--products',
+            type=int,
+            default=20000,
+            help='Количество товаров (по умолчанию: 20000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Количество повторов каждого запроса (по умолчанию: 20)',
+        )
+        parser.add_argument(
+            '--no-explain',
+            action='store_true',
+            help='Не выводить планы запросов',
+        )
+
+    def seed(self, count):
+        """Синтетический каталог: категории, товары (20% неактивных), заказы и корзины"""
+        rng = random.Random(42)
+        now = timezone.now()
+        categories = [
+            Category.objects.create(name=f'Bench category {i}', slug=f'bench-category-{i}')
+            for i in range(10)
+        ]
+        Product.objects.bulk_create([
+            Product(
+                name=f'Bench product {i}',
+                slug=f'bench-product-{i}',
+                description='Benchmark',
+                category=categories[i % len(categories)],
+                price=Decimal(rng.randrange(50, 5000) * 1000),
+                is_active=rng.random() > 0.2,
+                rating=Decimal(rng.randrange(0, 500)) / 100,
+                reviews_count=rng.randrange(0, 300),
+            )
+            for i in range(count)
+        ], batch_size=1000)
+        # created_at (auto_now_add) у всех одинаковый - разносим по времени
+        for offset in range(0, count, 1000):
+            ids = list(Product.objects.filter(slug__startswith='bench-product-').order_by('id').values_list('id', flat=True)[offset:offset + 1000])
+            Product.objects.filter(id__in=ids).update(created_at=now - timedelta(minutes=offset))
+        Order.objects.bulk_create([
+            Order(
+                session_key=f'bench{i % (count // 4 or 1):035d}',
+                first_name='Bench', last_name='Bench', email='bench@example.com', phone='0',
+                address='-', total=Decimal(100000), payment_method='cash',
+            )
+            for i in range(count // 2)
+        ], batch_size=1000)
+        Cart.objects.bulk_create([Cart(session_key=f'benchcart{i:031d}') for i in range(count // 2)], batch_size=1000)
+        # Устаревших корзин немного (5%), как в реальной очистке
+        Cart.objects.filter(session_key__startswith='benchcart', session_key__lt=f'benchcart{count // 40:031d}').update(
+            updated_at=now - timedelta(days=60)
+        )
+        return categories
+
+    def get_queries(self, categories):
+        """Запросы в том виде, в каком их выполняют index(), catalog(), ProductViewSet и product_detail()"""
+        active = Product.objects.filter(is_active=True)
+        category = categories[0]
+        product = active.filter(category=category).first()
+        return [
+            ('index: популярные', active.order_by(*SORT_ORDERINGS['popularity'])[:8]),
+            ('catalog: новинки', active.order_by(*SORT_ORDERINGS['newest'])[:12]),
+            ('catalog: цена по возрастанию', active.order_by(*SORT_ORDERINGS['price_low'])[:12]),
+            ('catalog: цена по убыванию', active.order_by(*SORT_ORDERINGS['price_high'])[:12]),
+            ('catalog: категория', active.filter(category=category).order_by(*SORT_ORDERINGS['newest'])[:12]),
+            ('product_detail: похожие', active.filter(category=category).exclude(id=product.id)[:4]),
+            ('api: заказы сессии', Order.objects.filter(session_key=f'bench{7:035d}')),
+            ('cleanup_old_carts', Cart.objects.filter(updated_at__lt=timezone.now() - timedelta(days=30)).only('id')[:100]),
+        ]
+
+    def measure(self, queries, repeat, explain):
+        results = {}
+        for label, queryset in queries:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[label] = statistics.median(timings)
+            if explain:
+                self.stdout.write(f'  {label}:')
+                for line in queryset.explain().splitlines():
+                    self.stdout.write(f'      {line}')
+        return results
+
+    def set_indexes(self, enabled):
+        # SQL индексов выполняется напрямую: schema_editor в SQLite нельзя открыть внутри транзакции
+        schema_editor = connection.schema_editor()
+        with connection.cursor() as cursor:
+            for model, names in BENCH_INDEXES.items():
+                for index in model._meta.indexes:
+                    if index.name in names:
+                        if enabled:
+                            sql = str(index.create_sql(model, schema_editor))
+                        else:
+                            sql = schema_editor.sql_delete_index % {
+                                'name': schema_editor.quote_name(index.name),
+                                'table': schema_editor.quote_name(model._meta.db_table),
+                            }
+                        cursor.execute(sql)
+
+    def analyze(self):
+        """Обновляет статистику планировщика (иначе SQLite/PostgreSQL могут не выбрать новый индекс)"""
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def handle(self, *args, **options):
+        explain = not options['no_explain']
+        self.stdout.write(f'СУБД: {connection.vendor}, товаров: {options["products"]}')
+        with transaction.atomic():
+            categories = self.seed(options['products'])
+            queries = self.get_queries(categories)
+
+            self.set_indexes(False)
+            self.analyze()
+            self.stdout.write(self.style.MIGRATE_HEADING('Без индексов'))
+            before = self.measure(queries, options['repeat'], explain)
+
+            self.set_indexes(True)
+            self.analyze()
+            self.stdout.write(self.style.MIGRATE_HEADING('С индексами'))
+            after = self.measure(queries, options['repeat'], explain)
+
+            transaction.set_rollback(True)
+
+        self.stdout.write('')
+        self.stdout.write(f'{"запрос":<32} {"без, мс":>9} {"с, мс":>9} {"ускорение":>10}')
+        for label, _ in queries:
+            speedup = before[label] / after[label] if after[label] else 0
+            self.stdout.write(f'{label:<32} {before[label]:>9.2f} {after[label]:>9.2f} {speedup:>9.1f}x')
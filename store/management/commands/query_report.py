@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from store.config_loader import invalidate_config
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Показывает количество SQL-запросов на каждую страницу магазина (холодный и прогретый кэш конфигурации)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            action='append',
+            dest='urls',
+            help='Дополнительный URL для проверки (можно указать несколько раз)',
+        )
+        parser.add_argument(
+            '--verbose-sql',
+            action='store_true',
+            help='Вывести сами SQL-запросы',
+        )
+
+    def get_urls(self):
+        urls = ['/', '/catalog/', '/cart/', '/about/', '/contact/', '/delivery/', '/faq/']
+        product = Product.objects.filter(is_active=True).only('slug').first()
+        if product:
+            urls.insert(2, f'/product/{product.slug}/')
+        return urls
+
+    def handle(self, *args, **options):
+        urls = self.get_urls() + (options['urls'] or [])
+        
+        self.stdout.write(f'{"URL":<40} {"статус":>6} {"холодный":>9} {"прогретый":>10}')
+        # Все запросы выполняются в транзакции, которая откатывается (сессии, корзины и т.д. не сохраняются)
+        with transaction.atomic():
+            client = Client()
+            for url in urls:
+                invalidate_config()
+                with CaptureQueriesContext(connection) as cold:
+                    response = client.get(url)
+                with CaptureQueriesContext(connection) as warm:
+                    client.get(url)
+                self.stdout.write(
+                    f'{url:<40} {response.status_code:>6} {len(cold.captured_queries):>9} {len(warm.captured_queries):>10}'
+                )
+                if options['verbose_sql']:
+                    for query in warm.captured_queries:
+                        self.stdout.write(f'    {query["sql"]}')
+            transaction.set_rollback(True)
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from store import search
+from store.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает полнотекстовый индекс товаров'
+
+    def handle(self, *args, **options):
+        backend = search.get_backend()
+        if backend is None:
+            self.stdout.write(self.style.WARNING('Текущая СУБД не поддерживает индекс, используется поиск через icontains.'))
+            return
+        
+        search.create_index()
+        count = search.rebuild_index(Product.objects.all())
+        self.stdout.write(self.style.SUCCESS(f'Проиндексировано товаров: {count} ({backend})'))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from store.models import Product
+from store.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает оценку популярности всех товаров (рейтинг, отзывы, недавние заказы с затуханием). '
+        'Запускайте раз в сутки, чтобы старые заказы постепенно переставали влиять на оценку'
+    )
+
+    def handle(self, *args, **options):
+        updated = refresh_popularity()
+        self.stdout.write(self.style.SUCCESS(
+            f'Популярность пересчитана: обновлено {updated} из {Product.objects.count()} товаров.'
+        ))
@@ -0,0 +1,127 @@
+import json
+import statistics
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import RequestFactory
+from rest_framework.request import Request
+from rest_framework.utils.encoders import JSONEncoder
+from store.fast_serializers import serialize_categories, serialize_products, serialize_cart
+from store.models import Category, Product, ProductImage, Cart, CartItem
+from store.serializers import CategorySerializer, ProductSerializer, CartSerializer
+from store.views import prefetch_cart_items
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время сериализации DRF (ModelSerializer) и быстрых сериализаторов (fast_serializers) '
+        'для товаров, категорий и корзины на 12, 100 и 1000 элементах. Данные создаются во временной транзакции'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='12,100,1000',
+            help='Размеры выборок через запятую (по умолчанию: 12,100,1000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=10,
+            help='Количество повторов (по умолчанию: 10)',
+        )
+
+    def seed(self, sizes):
+        """Товары с категориями и изображениями, по одной корзине на каждый размер выборки"""
+        count = max(sizes)
+        categories = Category.objects.bulk_create([
+            Category(name=f'Bench category {i}', slug=f'bench-serializer-category-{i}', description='Benchmark')
+            for i in range(10)
+        ])
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Bench product {i}',
+                slug=f'bench-serializer-product-{i}',
+                description='Benchmark description ' * 10,
+                category=categories[i % len(categories)],
+                price=Decimal(100000 + i),
+                old_price=Decimal(150000) if i % 3 == 0 else None,
+                image_url='https://example.com/image.jpg' if i % 2 else '',
+                image='products/bench.jpg' if i % 2 == 0 else '',
+                available_sizes='S, M, L',
+                available_colors='Черный, Белый',
+                stock=10,
+                rating=Decimal('4.50'),
+                reviews_count=i,
+            )
+            for i in range(count)
+        ], batch_size=500)
+        ProductImage.objects.bulk_create([
+            ProductImage(product=product, image=f'products/bench-{n}.jpg')
+            for product in products
+            for n in range(2)
+        ], batch_size=500)
+        carts = {}
+        for size in sizes:
+            carts[size] = Cart.objects.create(session_key=f'bench-serializer-cart-{size}')
+            CartItem.objects.bulk_create([
+                CartItem(cart=carts[size], product=product, quantity=2, size='M')
+                for product in products[:size]
+            ], batch_size=500)
+        return carts
+
+    def timeit(self, func, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def compare(self, label, size, drf, fast, repeat):
+        """Проверяет одинаковый JSON и выводит время обоих путей"""
+        drf_json = json.dumps(drf(), cls=JSONEncoder, sort_keys=True)
+        fast_json = json.dumps(fast(), cls=JSONEncoder, sort_keys=True)
+        if drf_json != fast_json:
+            raise CommandError(f'{label} ({size}): ответ быстрого сериализатора отличается от DRF')
+        drf_ms = self.timeit(drf, repeat)
+        fast_ms = self.timeit(fast, repeat)
+        self.stdout.write(f'{label:<14} {size:>6} {drf_ms:>10.2f} {fast_ms:>10.2f} {drf_ms / fast_ms:>9.1f}x')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',') if size.strip()]
+        repeat = options['repeat']
+        request = Request(RequestFactory().get('/api/products/', HTTP_HOST='localhost'))
+
+        with transaction.atomic():
+            carts = self.seed(sizes)
+            self.stdout.write(f'{"данные":<14} {"размер":>6} {"DRF, мс":>10} {"fast, мс":>10} {"ускорение":>10}')
+            for size in sizes:
+                # Объекты загружаются один раз: измеряется только сериализация
+                products = list(
+                    Product.objects.filter(slug__startswith='bench-serializer-product-')
+                    .select_related('category').prefetch_related('images')[:size]
+                )
+                self.compare(
+                    'products', size,
+                    lambda: ProductSerializer(products, many=True, context={'request': request}).data,
+                    lambda: serialize_products(products, request),
+                    repeat,
+                )
+                categories = [product.category for product in products]
+                self.compare(
+                    'categories', size,
+                    lambda: CategorySerializer(categories, many=True, context={'request': request}).data,
+                    lambda: serialize_categories(categories, request),
+                    repeat,
+                )
+                cart = carts[size]
+                prefetch_cart_items(cart)
+                self.compare(
+                    'cart', size,
+                    lambda: CartSerializer(cart, context={'request': request}).data,
+                    lambda: serialize_cart(cart, request),
+                    repeat,
+                )
+            transaction.set_rollback(True)
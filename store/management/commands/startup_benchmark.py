@@ -0,0 +1,68 @@
+import json
+import statistics
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Скрипт выполняется в отдельном процессе, чтобы мерить холодный старт, а не уже загруженный Django
+BOOT_SCRIPT = r'''
+import os, sys, time, json
+t0 = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'fashionstore.settings')
+import django
+from django.conf import settings
+settings.INSTALLED_APPS  # импорт settings.py (включая чтение config.json)
+t1 = time.perf_counter()
+django.setup()
+t2 = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns  # импорт urls и views, как при первом запросе воркера
+t3 = time.perf_counter()
+print(json.dumps({'settings': t1 - t0, 'setup': t2 - t1, 'wsgi': t3 - t2, 'total': t3 - t0}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время холодного старта процесса: импорт settings, django.setup() и загрузка WSGI-приложения'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=5,
+            help='Количество запусков (по умолчанию: 5)',
+        )
+
+    def handle(self, *args, **options):
+        runs = options['runs']
+        results = []
+        
+        for _ in range(runs):
+            process = subprocess.run(
+                [sys.executable, '-c', BOOT_SCRIPT],
+                cwd=settings.BASE_DIR,
+                capture_output=True,
+                text=True,
+            )
+            if process.returncode != 0:
+                self.stdout.write(self.style.ERROR(process.stderr))
+                return
+            results.append(json.loads(process.stdout.strip().splitlines()[-1]))
+        
+        self.stdout.write(f'Запусков: {runs}')
+        for stage, label in (
+            ('settings', 'Импорт settings'),
+            ('setup', 'django.setup()'),
+            ('wsgi', 'WSGI-приложение + URLconf'),
+            ('total', 'Итого'),
+        ):
+            values = [r[stage] * 1000 for r in results]
+            self.stdout.write(
+                f'  {label:<28} медиана {statistics.median(values):8.1f} мс   '
+                f'мин {min(values):8.1f} мс   макс {max(values):8.1f} мс'
+            )
+        self.stdout.write(self.style.SUCCESS('Готово'))
@@ -17,12 +17,15 @@ class LanguageSessionMiddleware:
         response = self.get_response(request)
         
         # После обработки запроса сохраняем текущий язык в сессии
-        if hasattr(request, 'session') and hasattr(request, 'LANGUAGE_CODE'):
+        # Сессия ради языка не создается: у нового посетителя язык хранится в cookie (set_language),
+        # а сессия появляется вместе с корзиной или заказом
+        if hasattr(request, 'session') and hasattr(request, 'LANGUAGE_CODE') and request.session.session_key:
             current_language = translation.get_language()
             if current_language and current_language in dict(settings.LANGUAGES):
-                # Сохраняем язык в сессии для следующего запроса
-                request.session['django_language'] = current_language
-                request.session.modified = True
+                # Сохраняем язык в сессии для следующего запроса (только при изменении, чтобы не писать
+                # сессию в БД на каждый запрос, например на каждое нажатие клавиши в подсказках поиска)
+                if request.session.get('django_language') != current_language:
+                    request.session['django_language'] = current_language
         
         return response
 
@@ -0,0 +1,24 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    from store import search
+    search.create_index(schema_editor.connection)
+    Product = apps.get_model('store', 'Product')
+    search.rebuild_index(Product.objects.all())
+
+
+def drop_search_index(apps, schema_editor):
+    from store import search
+    search.drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0020_configversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_facets(apps, schema_editor):
+    from store.facets import product_facet_values
+    Product = apps.get_model('store', 'Product')
+    ProductFacet = apps.get_model('store', 'ProductFacet')
+    facets = []
+    for product in Product.objects.all().iterator():
+        facets += [
+            ProductFacet(product_id=product.pk, kind=kind, value=value)
+            for kind, value in product_facet_values(product)
+        ]
+    ProductFacet.objects.bulk_create(facets, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0021_product_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('size', 'Размер'), ('color', 'Цвет')], max_length=10, verbose_name='Тип')),
+                ('value', models.CharField(max_length=50, verbose_name='Значение')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='store.product', verbose_name='Товар')),
+            ],
+            options={
+                'verbose_name': 'Фильтр товара',
+                'verbose_name_plural': 'Фильтры товаров',
+                'indexes': [models.Index(fields=['kind', 'value', 'product'], name='store_facet_kind_value_idx')],
+                'unique_together': {('product', 'kind', 'value')},
+            },
+        ),
+        migrations.RunPython(backfill_facets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:38
+
+from django.db import migrations, models
+
+
+def compute_popularity(apps, schema_editor):
+    from store.popularity import refresh_popularity
+    refresh_popularity(
+        product_model=apps.get_model('store', 'Product'),
+        order_item_model=apps.get_model('store', 'OrderItem'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('store', '0024_sort_mode_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='store_prod_active_pop_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='popularity_score',
+            field=models.FloatField(default=0, editable=False, help_text='Рассчитывается автоматически по рейтингу, отзывам и недавним заказам (см. popularity.py)', verbose_name='Популярность'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['-popularity_score', '-id'], name='store_prod_active_pop_idx'),
+        ),
+        migrations.RunPython(compute_popularity, migrations.RunPython.noop),
+    ]
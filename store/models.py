@@ -1,4 +1,8 @@
-from django.db import models
+from decimal import Decimal
+from django.db import connection, models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.contrib.auth.models import User
 import json
 
@@ -64,6 +68,12 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True, verbose_name='Активен')
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0, verbose_name='Рейтинг')
     reviews_count = models.PositiveIntegerField(default=0, verbose_name='Количество отзывов')
+    popularity_score = models.FloatField(
+        default=0,
+        editable=False,
+        verbose_name='Популярность',
+        help_text='Рассчитывается автоматически по рейтингу, отзывам и недавним заказам (см. popularity.py)'
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
 
@@ -71,11 +81,78 @@ class Product(models.Model):
         verbose_name = 'Товар'
         verbose_name_plural = 'Товары'
         ordering = ['-created_at']
+        # Частичные индексы (только активные товары) под сортировки витрины, каталога и API (catalog.SORT_ORDERINGS)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='store_prod_active_new_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['-popularity_score', '-id'], name='store_prod_active_pop_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['price', 'id'], name='store_prod_active_price_idx', condition=models.Q(is_active=True)),
+            models.Index(fields=['category', '-created_at', '-id'], name='store_prod_active_cat_idx', condition=models.Q(is_active=True)),
+        ]
 
     def __str__(self):
         return self.name
 
 
+class ProductFacet(models.Model):
+    """
+    Нормализованные значения фильтров товара (размеры и цвета).
+    Заполняется автоматически из available_sizes / available_colors при сохранении товара (см. facets.py),
+    чтобы фильтры каталога были равенством по индексу, а не поиском подстроки.
+    """
+    KIND_SIZE = 'size'
+    KIND_COLOR = 'color'
+    KIND_CHOICES = [
+        (KIND_SIZE, 'Размер'),
+        (KIND_COLOR, 'Цвет'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='facets', verbose_name='Товар')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, verbose_name='Тип')
+    value = models.CharField(max_length=50, verbose_name='Значение')
+
+    class Meta:
+        verbose_name = 'Фильтр товара'
+        verbose_name_plural = 'Фильтры товаров'
+        unique_together = ['product', 'kind', 'value']
+        indexes = [
+            models.Index(fields=['kind', 'value', 'product'], name='store_facet_kind_value_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.kind}={self.value}"
+
+
+class RelatedProduct(models.Model):
+    """
+    Предрассчитанные похожие товары для страницы товара (см. recommendations.py):
+    сначала товары, которые покупают вместе с этим, затем популярные товары той же категории.
+    Перестраивается командой build_related_products.
+    """
+    SOURCE_CO_PURCHASE = 'co_purchase'
+    SOURCE_CATEGORY = 'category'
+    SOURCE_CHOICES = [
+        (SOURCE_CO_PURCHASE, 'Покупают вместе'),
+        (SOURCE_CATEGORY, 'Та же категория'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='related_links', verbose_name='Товар')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+', verbose_name='Похожий товар')
+    rank = models.PositiveSmallIntegerField(verbose_name='Позиция')
+    score = models.FloatField(default=0, verbose_name='Оценка')
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, verbose_name='Источник')
+
+    class Meta:
+        verbose_name = 'Похожий товар'
+        verbose_name_plural = 'Похожие товары'
+        unique_together = ['product', 'related']
+        indexes = [
+            models.Index(fields=['product', 'rank'], name='store_related_product_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} ({self.source})"
+
+
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images', verbose_name='Товар')
     image = models.ImageField(upload_to='products/', verbose_name='Изображение')
@@ -89,25 +166,91 @@ class ProductImage(models.Model):
         return f"{self.product.name} - изображение"
 
 
+def cart_totals(prefix=''):
+    """
+    Выражения суммы и количества товаров корзины для aggregate/annotate (один запрос, без загрузки позиций).
+    prefix='items__' - для аннотации запроса корзин, '' - для агрегата по позициям одной корзины.
+    """
+    money = models.DecimalField(max_digits=14, decimal_places=2)
+    return {
+        'cart_total': Coalesce(
+            Sum(F(f'{prefix}quantity') * F(f'{prefix}product__price'), output_field=money),
+            Value(Decimal('0')),
+            output_field=money,
+        ),
+        'cart_items_count': Coalesce(Sum(f'{prefix}quantity'), 0),
+    }
+
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Корзины с суммой и количеством товаров (аннотации cart_total и cart_items_count)"""
+        return self.annotate(**cart_totals('items__'))
+
+
 class Cart(models.Model):
     session_key = models.CharField(max_length=40, unique=True, verbose_name='Ключ сессии')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Создано')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
 
+    objects = CartQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
+        indexes = [
+            models.Index(fields=['updated_at'], name='store_cart_updated_idx'),  # cleanup_old_carts
+        ]
 
     def __str__(self):
         return f"Корзина {self.session_key}"
 
+    @classmethod
+    def get_for_session(cls, session, create=False):
+        """
+        Корзина сессии. Без create не создает ни сессию, ни корзину и возвращает None, если их еще нет:
+        чтение корзины (значок в шапке, страница корзины) не должно превращаться в запись для каждого
+        нового посетителя или бота. Корзина создается при первом добавлении товара.
+        """
+        if not session.session_key:
+            if not create:
+                return None
+            session.create()
+        if create:
+            return cls.objects.get_or_create(session_key=session.session_key)[0]
+        return cls.objects.filter(session_key=session.session_key).first()
+
+    @staticmethod
+    def get_summary(session):
+        """
+        {'items_count', 'total'} корзины сессии одним агрегирующим запросом по позициям, без загрузки корзины.
+        Без сессии - нули без обращения к БД.
+        """
+        if not session.session_key:
+            return {'items_count': 0, 'total': Decimal('0')}
+        totals = CartItem.objects.filter(cart__session_key=session.session_key).aggregate(**cart_totals())
+        return {'items_count': totals['cart_items_count'], 'total': totals['cart_total']}
+
+    def get_totals(self):
+        """
+        (сумма, количество товаров): из аннотаций with_totals(), из уже загруженных позиций (prefetch_related)
+        или одним агрегирующим запросом, результат которого запоминается на объекте
+        """
+        if not hasattr(self, 'cart_total'):
+            prefetched = getattr(self, '_prefetched_objects_cache', {}).get('items')
+            if prefetched is not None:
+                return sum(item.total for item in prefetched), sum(item.quantity for item in prefetched)
+            totals = self.items.aggregate(**cart_totals())
+            self.cart_total, self.cart_items_count = totals['cart_total'], totals['cart_items_count']
+        return self.cart_total, self.cart_items_count
+
     @property
     def total(self):
-        return sum(item.total for item in self.items.all())
+        return self.get_totals()[0]
 
     @property
     def items_count(self):
-        return sum(item.quantity for item in self.items.all())
+        return self.get_totals()[1]
 
 
 class CartItem(models.Model):
@@ -131,6 +274,40 @@ class CartItem(models.Model):
     def total(self):
         return self.product.price * self.quantity
 
+    @classmethod
+    def add(cls, cart, product_id, quantity=1, size='', color=''):
+        """
+        Атомарно добавляет товар в корзину: новая позиция или quantity = quantity + N для существующей.
+        SQLite/PostgreSQL - один запрос INSERT ... SELECT ... ON CONFLICT DO UPDATE (проверка активности товара
+        в том же запросе), другие СУБД - get_or_create и UPDATE с F()-выражением.
+        Параллельные добавления (двойной клик, две вкладки) не теряют количество.
+        Возвращает id позиции или None, если товар не найден или неактивен.
+        """
+        if connection.vendor in ('sqlite', 'postgresql'):
+            qn = connection.ops.quote_name
+            table = qn(cls._meta.db_table)
+            now = connection.ops.adapt_datetimefield_value(timezone.now())
+            sql = (
+                f'INSERT INTO {table} (cart_id, product_id, quantity, size, color, created_at, updated_at) '
+                f'SELECT %s, id, %s, %s, %s, %s, %s FROM {qn(Product._meta.db_table)} WHERE id = %s AND is_active '
+                f'ON CONFLICT (cart_id, product_id, size, color) DO UPDATE SET '
+                f'quantity = {table}.quantity + excluded.quantity, updated_at = excluded.updated_at '
+                f'RETURNING id'
+            )
+            with connection.cursor() as cursor:
+                cursor.execute(sql, [cart.pk, quantity, size, color, now, now, product_id])
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        if not Product.objects.filter(id=product_id, is_active=True).exists():
+            return None
+        item, created = cls.objects.get_or_create(
+            cart=cart, product_id=product_id, size=size, color=color, defaults={'quantity': quantity}
+        )
+        if not created:
+            cls.objects.filter(pk=item.pk).update(quantity=F('quantity') + quantity, updated_at=timezone.now())
+        return item.pk
+
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -167,6 +344,9 @@ class Order(models.Model):
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['session_key', '-created_at'], name='store_order_session_idx'),  # заказы текущей сессии
+        ]
 
     def __str__(self):
         return f"Заказ #{self.id} - {self.first_name} {self.last_name}"
@@ -245,17 +425,12 @@ class Config(models.Model):
         Синхронизирует конфигурацию с файлом config.json
         """
         try:
-            from pathlib import Path
-            import json
-            
-            BASE_DIR = Path(__file__).resolve().parent.parent
-            config_path = BASE_DIR / 'config.json'
+            from .config_loader import write_config_file, reload_config
             
-            with open(config_path, 'w', encoding='utf-8') as f:
-                json.dump(self.config_data, f, ensure_ascii=False, indent=2)
+            # Атомарная запись (временный файл + rename), чтобы читатели не увидели недописанный файл
+            write_config_file(self.config_data)
             
             # Перезагружаем кэш конфигурации
-            from .config_loader import reload_config
             reload_config()
         except Exception as e:
             print(f"Ошибка синхронизации конфигурации с файлом: {e}")
@@ -274,6 +449,43 @@ class Config(models.Model):
         return None
 
 
+class ConfigVersion(models.Model):
+    """
+    Общий для всех воркеров номер версии конфигурации.
+    Увеличивается при каждом изменении моделей конфигурации; воркеры сравнивают его
+    со своим локальным снимком и пересобирают снимок только при расхождении.
+    """
+    key = models.CharField(max_length=50, unique=True, default='config', verbose_name='Ключ')
+    version = models.PositiveBigIntegerField(default=0, verbose_name='Версия')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Обновлено')
+
+    class Meta:
+        verbose_name = 'Версия конфигурации'
+        verbose_name_plural = 'Версии конфигурации'
+
+    def __str__(self):
+        return f"{self.key}: {self.version}"
+
+    @classmethod
+    def get_version(cls, key='config'):
+        """Текущая версия (одно чтение по уникальному индексу)"""
+        return cls.objects.filter(key=key).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def get_state(cls, key='config'):
+        """(версия, время последнего изменения) одним чтением; (0, None), если версии еще нет"""
+        return cls.objects.filter(key=key).values_list('version', 'updated_at').first() or (0, None)
+
+    @classmethod
+    def bump(cls, key='config'):
+        """Атомарно увеличивает версию и возвращает новое значение"""
+        # update() не применяет auto_now: время изменения ставится явно (Last-Modified в store.conditional)
+        updated = cls.objects.filter(key=key).update(version=models.F('version') + 1, updated_at=timezone.now())
+        if not updated:
+            cls.objects.get_or_create(key=key, defaults={'version': 1})
+        return cls.get_version(key)
+
+
 class StoreConfig(models.Model):
     """Конфигурация магазина"""
     name = models.CharField(max_length=200, default='Fashion Store', verbose_name='Название магазина')
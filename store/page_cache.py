@@ -0,0 +1,152 @@
+"""
+Кэш целых страниц витрины для анонимных посетителей (index, catalog, product_detail, about, faq, delivery)
+
+Ключ: путь, нормализованная строка запроса (параметры отсортированы, метки utm_* и т.п. отброшены), язык
+и версии тегов страницы. Тег - группа моделей, от которых зависит страница (PAGE_CACHE_TAGS); сигналы
+post_save/post_delete этих моделей увеличивают версию тега в кэше (после коммита), и все страницы с этим тегом
+перестают совпадать по ключу. Тег config есть у всех страниц: шапка и подвал строятся из моделей конфигурации.
+
+Данные посетителя: в кэш попадает страница с заглушками вместо CSRF-токена и количества товаров в корзине
+(см. context_processors.page_cache_placeholders), при каждой отдаче они заменяются данными текущего посетителя. Сессия и cookie не кэшируются: кэшируется только HTML,
+а SessionMiddleware (в т.ч. с SESSION_SAVE_EVERY_REQUEST) и CsrfViewMiddleware отрабатывают как обычно.
+"""
+import hashlib
+from functools import wraps
+from urllib.parse import parse_qsl, urlencode
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils import translation
+from .models import (
+    Product, Category, ProductImage, Cart, FAQ, AboutConfig, AboutStat,
+    Config, StoreConfig, ContactConfig, SocialConfig, HeroConfig, Feature, SEOConfig, ThemeConfig,
+    ProductFeatureConfig, Partner,
+)
+
+PAGE_CACHE_ENABLED = getattr(settings, 'PAGE_CACHE_ENABLED', True)
+PAGE_CACHE_TIMEOUT = getattr(settings, 'PAGE_CACHE_TIMEOUT', 600)
+PAGE_CACHE_VERSION_KEY = 'page_cache_version:{}'
+
+# Параметры, которые не меняют содержимое страницы (рекламные метки)
+IGNORED_QUERY_PARAMS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content', 'fbclid', 'gclid', 'yclid')
+
+# Теги страниц и модели, изменение которых их инвалидирует
+PAGE_CACHE_TAGS = {
+    'catalog': (Product, Category, ProductImage),
+    'about': (AboutConfig, AboutStat),
+    'faq': (FAQ,),
+    'config': (
+        Config, StoreConfig, ContactConfig, SocialConfig, HeroConfig, Feature,
+        AboutConfig, SEOConfig, ThemeConfig, ProductFeatureConfig, Partner,
+    ),
+}
+
+# Заглушки данных посетителя в закэшированном HTML: CSRF-токен и количество товаров в корзине (значок в шапке)
+CSRF_PLACEHOLDER = 'page-cache-csrf-token-placeholder'
+CART_COUNT_PLACEHOLDER = 'page-cache-cart-count-placeholder'
+
+
+def normalize_query(query_dict):
+    """Строка запроса с отсортированными параметрами и без рекламных меток"""
+    params = sorted(
+        (key, value) for key, value in parse_qsl(query_dict.urlencode(), keep_blank_values=True)
+        if key not in IGNORED_QUERY_PARAMS
+    )
+    return urlencode(params)
+
+
+def get_tag_versions(tags):
+    """Текущие версии тегов: {тег: версия} (одним обращением к кэшу)"""
+    keys = {tag: PAGE_CACHE_VERSION_KEY.format(tag) for tag in tags}
+    versions = cache.get_many(keys.values())
+    return {tag: versions.get(key, 0) for tag, key in keys.items()}
+
+
+def page_cache_key(request, tags):
+    versions = get_tag_versions(tags)
+    raw = '|'.join((
+        request.path,
+        normalize_query(request.GET),
+        translation.get_language() or '',
+        ','.join(f'{tag}={versions[tag]}' for tag in sorted(versions)),
+    ))
+    return 'page_cache:' + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def is_cacheable_request(request):
+    """Только GET/HEAD анонимных посетителей (администратор видит страницы без кэша)"""
+    if not PAGE_CACHE_ENABLED or request.method not in ('GET', 'HEAD'):
+        return False
+    user = getattr(request, 'user', None)
+    return user is None or not user.is_authenticated
+
+
+def _fill_visitor_data(request, response):
+    """
+    Подставляет данные посетителя вместо заглушек: CSRF-токен (cookie выставит CsrfViewMiddleware)
+    и количество товаров в корзине (запрос к БД только при наличии сессии)
+    """
+    content = response.content
+    csrf_placeholder = CSRF_PLACEHOLDER.encode()
+    if csrf_placeholder in content:
+        content = content.replace(csrf_placeholder, get_token(request).encode())
+    cart_placeholder = CART_COUNT_PLACEHOLDER.encode()
+    if cart_placeholder in content:
+        count = Cart.get_summary(request.session)['items_count']
+        content = content.replace(cart_placeholder, str(count).encode())
+    response.content = content
+    return response
+
+
+def anonymous_page_cache(*tags):
+    """
+    Декоратор view: кэширует HTML ответа 200 для анонимных посетителей.
+    tags - группы моделей из PAGE_CACHE_TAGS, от которых зависит страница (config добавляется всегда).
+    """
+    tags = tuple(sorted(set(tags) | {'config'}))
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not is_cacheable_request(request):
+                return view(request, *args, **kwargs)
+
+            key = page_cache_key(request, tags)
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                response['X-Page-Cache'] = 'hit'
+                return _fill_visitor_data(request, response)
+
+            request.page_cache_placeholders = True
+            response = view(request, *args, **kwargs)
+            if response.status_code == 200 and not response.streaming and not response.cookies:
+                cache.set(key, (response.content, response['Content-Type']), PAGE_CACHE_TIMEOUT)
+                response['X-Page-Cache'] = 'miss'
+            return _fill_visitor_data(request, response)
+        return wrapper
+    return decorator
+
+
+def _bump_version(tag):
+    key = PAGE_CACHE_VERSION_KEY.format(tag)
+    if cache.add(key, 1, None):
+        return
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def invalidate_pages(*tags):
+    """Инвалидирует страницы с тегами после коммита (иначе страница может закэшироваться по старым данным)"""
+    for tag in tags:
+        transaction.on_commit(lambda tag=tag: _bump_version(tag))
+
+
+def invalidate_page_cache(sender, **kwargs):
+    """Обработчик post_save/post_delete: инвалидирует страницы, зависящие от модели sender"""
+    invalidate_pages(*(tag for tag, models in PAGE_CACHE_TAGS.items() if sender in models))
@@ -0,0 +1,166 @@
+"""
+Keyset (cursor) пагинация для каталога и API товаров.
+
+Вместо COUNT(*) + OFFSET n следующая страница выбирается условием "после последней строки
+предыдущей страницы" по кортежу сортировки, например (-created_at, -id):
+    WHERE created_at < :c OR (created_at = :c AND id < :id) ORDER BY created_at DESC, id DESC LIMIT n + 1
+Поэтому страница 500 стоит столько же, сколько страница 1. Курсор - base64(JSON) значений сортировки
+последней строки страницы.
+"""
+import base64
+import binascii
+import json
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+CURSOR_PARAM = 'cursor'
+
+
+class InvalidCursor(Exception):
+    """Курсор поврежден или не соответствует текущей сортировке"""
+
+
+def get_ordering(queryset):
+    """
+    Кортеж сортировки queryset с уникальным завершающим полем id.
+    Без него строки с одинаковыми значениями сортировки могли бы теряться или повторяться между страницами.
+    """
+    ordering = []
+    for field in list(queryset.query.order_by) or list(queryset.model._meta.ordering):
+        if not isinstance(field, str):
+            raise InvalidCursor(field)  # Сортировка выражением не поддерживается
+        direction = '-' if field.startswith('-') else ''
+        name = field.lstrip('-')
+        ordering.append(direction + ('id' if name == 'pk' else name))
+    if not any(field.lstrip('-') == 'id' for field in ordering):
+        # Направление id совпадает с направлением последнего поля, чтобы индекс читался в одну сторону
+        ordering.append('-id' if ordering and ordering[-1].startswith('-') else 'id')
+    return ordering
+
+
+def _field_value(obj, field):
+    """Значение поля сортировки у объекта (поддерживает аннотации и связи через __)"""
+    value = obj
+    for part in field.split('__'):
+        value = getattr(value, part, None)
+    return value
+
+
+def _to_json(value):
+    """Значение сортировки -> JSON-совместимое значение"""
+    if value is None or isinstance(value, (int, float, str, bool)):
+        return value
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
+
+def _from_json(queryset, field, value):
+    """JSON-значение из курсора -> значение поля модели (для сравнения в WHERE)"""
+    if value is None:
+        return None
+    try:
+        model_field = queryset.model._meta.get_field(field.split('__')[0])
+    except FieldDoesNotExist:
+        # Аннотация (например, search_rank) - числовое значение из JSON
+        return value
+    if '__' in field:
+        return value
+    try:
+        return model_field.to_python(value)
+    except ValidationError:
+        raise InvalidCursor(field)
+
+
+def encode_cursor(obj, ordering):
+    """Курсор, указывающий на позицию сразу после obj"""
+    values = [_to_json(_field_value(obj, field.lstrip('-'))) for field in ordering]
+    payload = json.dumps({'o': ordering, 'v': values}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, queryset, ordering):
+    """Значения сортировки из курсора; курсор от другой сортировки считается недействительным"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+        stored_ordering, values = payload['o'], payload['v']
+    except (ValueError, KeyError, TypeError, binascii.Error, UnicodeError):
+        raise InvalidCursor(token)
+    if stored_ordering != ordering or len(values) != len(ordering):
+        raise InvalidCursor(token)
+    return [_from_json(queryset, field.lstrip('-'), value) for field, value in zip(ordering, values)]
+
+
+def keyset_condition(ordering, values):
+    """
+    Условие "строго после" для кортежа сортировки:
+    (a > va) OR (a = va AND b > vb) OR (a = va AND b = vb AND id > vid) ...
+    """
+    condition = Q()
+    equal = Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def paginate_keyset(queryset, cursor, page_size):
+    """
+    Возвращает (товары страницы, курсор следующей страницы или None).
+    cursor - None/пустая строка для первой страницы.
+    """
+    ordering = get_ordering(queryset)
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = decode_cursor(cursor, queryset, ordering)
+        queryset = queryset.filter(keyset_condition(ordering, values))
+    items = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(items) > page_size:
+        items = items[:page_size]
+        next_cursor = encode_cursor(items[-1], ordering)
+    return items, next_cursor
+
+
+class ProductPagination(PageNumberPagination):
+    """
+    Постраничная навигация товаров.
+    По умолчанию - номера страниц (как раньше); с параметром ?cursor= (пустой для первой страницы) -
+    keyset-пагинация без COUNT(*) и OFFSET: ответ {"next": url, "previous": null, "results": [...]}.
+    Размер страницы можно задать параметром ?page_size= (не больше max_page_size).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = CURSOR_PARAM in request.query_params
+        if not self.cursor_mode:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            items, self.next_cursor = paginate_keyset(queryset, request.query_params.get(CURSOR_PARAM), page_size)
+        except InvalidCursor:
+            raise NotFound('Invalid cursor.')
+        return items
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        next_url = None
+        if self.next_cursor:
+            url = remove_query_param(self.request.build_absolute_uri(), 'page')
+            next_url = replace_query_param(url, CURSOR_PARAM, self.next_cursor)
+        return Response({
+            'next': next_url,
+            'previous': None,
+            'results': data,
+        })
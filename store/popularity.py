@@ -0,0 +1,84 @@
+"""
+Оценка популярности товара (Product.popularity_score) для главной страницы, /api/products/popular/
+и сортировки каталога "По популярности".
+
+score = RATING_WEIGHT * rating * reviews / (reviews + REVIEWS_PRIOR)   - рейтинг, сглаженный числом отзывов
+      + REVIEWS_WEIGHT * ln(1 + reviews)
+      + ORDERS_WEIGHT * ln(1 + sum(quantity * 0.5 ** (возраст заказа / ORDERS_HALF_LIFE_DAYS)))
+
+Заказы старше ORDERS_WINDOW_DAYS и отмененные не учитываются. Оценка хранится в колонке с частичным индексом,
+поэтому выборка топ-N - чтение индекса. Пересчет: инкрементально сигналами (новый заказ, смена статуса,
+сохранение товара) и полностью командой refresh_popularity (раз в сутки, чтобы учесть затухание).
+"""
+import math
+from collections import defaultdict
+from datetime import timedelta
+from django.conf import settings
+from django.utils import timezone
+from .conditional import invalidate_catalog_version
+from .models import Product, OrderItem
+from .page_cache import invalidate_pages
+
+RATING_WEIGHT = getattr(settings, 'POPULARITY_RATING_WEIGHT', 1.0)
+REVIEWS_PRIOR = getattr(settings, 'POPULARITY_REVIEWS_PRIOR', 5)
+REVIEWS_WEIGHT = getattr(settings, 'POPULARITY_REVIEWS_WEIGHT', 0.5)
+ORDERS_WEIGHT = getattr(settings, 'POPULARITY_ORDERS_WEIGHT', 2.0)
+ORDERS_HALF_LIFE_DAYS = getattr(settings, 'POPULARITY_ORDERS_HALF_LIFE_DAYS', 14)
+ORDERS_WINDOW_DAYS = getattr(settings, 'POPULARITY_ORDERS_WINDOW_DAYS', 90)
+
+EXCLUDED_ORDER_STATUSES = ('cancelled',)
+
+
+def popularity_score(rating, reviews_count, decayed_orders):
+    """Оценка по рейтингу, числу отзывов и взвешенному по давности количеству заказанных единиц"""
+    rating = float(rating or 0)
+    reviews = reviews_count or 0
+    return (
+        RATING_WEIGHT * rating * reviews / (reviews + REVIEWS_PRIOR)
+        + REVIEWS_WEIGHT * math.log1p(reviews)
+        + ORDERS_WEIGHT * math.log1p(decayed_orders)
+    )
+
+
+def decayed_order_volume(product_ids=None, now=None, order_item_model=OrderItem):
+    """{product_id: количество заказанных единиц с экспоненциальным затуханием по возрасту заказа}"""
+    now = now or timezone.now()
+    items = order_item_model.objects.filter(
+        order__created_at__gte=now - timedelta(days=ORDERS_WINDOW_DAYS)
+    ).exclude(order__status__in=EXCLUDED_ORDER_STATUSES)
+    if product_ids is not None:
+        items = items.filter(product_id__in=product_ids)
+    volume = defaultdict(float)
+    for product_id, quantity, created_at in items.values_list('product_id', 'quantity', 'order__created_at').iterator():
+        age_days = max((now - created_at).total_seconds(), 0) / 86400
+        volume[product_id] += quantity * 0.5 ** (age_days / ORDERS_HALF_LIFE_DAYS)
+    return volume
+
+
+def refresh_popularity(product_ids=None, now=None, batch_size=500, product_model=Product, order_item_model=OrderItem):
+    """
+    Пересчитывает popularity_score для переданных товаров (None - для всех).
+    Записывает только изменившиеся значения через bulk_update (без сигналов post_save).
+    product_model/order_item_model - для вызова из миграции с историческими моделями.
+    Возвращает количество обновленных товаров.
+    """
+    products = product_model.objects.only('id', 'rating', 'reviews_count', 'popularity_score')
+    if product_ids is not None:
+        product_ids = list(product_ids)
+        if not product_ids:
+            return 0
+        products = products.filter(id__in=product_ids)
+    volume = decayed_order_volume(product_ids, now, order_item_model)
+
+    changed = []
+    for product in products.iterator(chunk_size=batch_size):
+        score = round(popularity_score(product.rating, product.reviews_count, volume.get(product.id, 0.0)), 6)
+        if score != product.popularity_score:
+            product.popularity_score = score
+            changed.append(product)
+    product_model.objects.bulk_update(changed, ['popularity_score'], batch_size=batch_size)
+    if changed and product_model is Product:
+        # bulk_update не отправляет сигналы: порядок "По популярности" и ETag каталога сбрасываем явно
+        invalidate_pages('catalog')
+        invalidate_catalog_version()
+    return len(changed)
@@ -0,0 +1,189 @@
+"""
+Похожие товары для страницы товара по совместным покупкам (OrderItem).
+
+Офлайн-задача (команда build_related_products):
+1. Пары (заказ, товар) из неотмененных заказов за RELATED_WINDOW_DAYS дней.
+2. Матрица совместных покупок C = Aᵀ·A (A - разреженная матрица заказ × товар) считается векторно в NumPy:
+   все пары товаров внутри каждого заказа кодируются одним int64 и суммируются через np.unique.
+   Без NumPy - тот же расчет на чистом Python (медленнее на больших объемах).
+3. Оценка пары - косинусная близость count / sqrt(orders_a * orders_b), чтобы хиты продаж не попадали
+   в похожие ко всем товарам подряд.
+4. Для каждого товара сохраняется топ-K (RelatedProduct); если совместных покупок мало,
+   список дополняется популярными товарами той же категории.
+
+Страница товара читает готовый список одним запросом по индексу (get_related_products).
+"""
+import math
+from collections import Counter, defaultdict
+from datetime import timedelta
+from itertools import permutations
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from .catalog import SORT_ORDERINGS
+from .models import Product, OrderItem, RelatedProduct
+from .conditional import invalidate_catalog_version
+from .page_cache import invalidate_pages
+from .popularity import EXCLUDED_ORDER_STATUSES
+
+try:
+    import numpy as np
+except ImportError:  # NumPy необязателен: без него работает запасной расчет на Python
+    np = None
+
+RELATED_TOP_K = getattr(settings, 'RELATED_PRODUCTS_TOP_K', 8)
+RELATED_WINDOW_DAYS = getattr(settings, 'RELATED_PRODUCTS_WINDOW_DAYS', 365)
+# Большие заказы (оптовые) дают квадратичное число пар и почти не несут сигнала
+MAX_BASKET_SIZE = getattr(settings, 'RELATED_PRODUCTS_MAX_BASKET_SIZE', 50)
+
+
+def _order_product_pairs(now=None):
+    """Уникальные пары (order_id, product_id) из неотмененных заказов за окно"""
+    now = now or timezone.now()
+    return OrderItem.objects.filter(
+        order__created_at__gte=now - timedelta(days=RELATED_WINDOW_DAYS)
+    ).exclude(order__status__in=EXCLUDED_ORDER_STATUSES).values_list('order_id', 'product_id').distinct()
+
+
+def co_purchase_counts_numpy(pairs):
+    """
+    Векторный расчет по массиву пар (order_id, product_id).
+    Возвращает (a, b, count, orders_per_product): массивы пар товаров a != b с числом общих заказов
+    и словарь {product_id: число заказов}.
+    """
+    data = np.unique(np.asarray(pairs, dtype=np.int64).reshape(-1, 2), axis=0)  # сортировка по заказу
+    _, lengths = np.unique(data[:, 0], return_counts=True)
+    keep = np.repeat((lengths >= 2) & (lengths <= MAX_BASKET_SIZE), lengths)
+    orders_per_product = Counter(data[:, 1].tolist())
+    data = data[keep]
+    if not len(data):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, empty, orders_per_product
+
+    products = data[:, 1]
+    _, starts, lengths = np.unique(data[:, 0], return_index=True, return_counts=True)
+    # Для элемента i корзины длины L - L партнеров: индексы start..start+L-1 той же корзины
+    element_length = np.repeat(lengths, lengths)
+    element_start = np.repeat(starts, lengths)
+    left = np.repeat(np.arange(len(products)), element_length)
+    offsets = np.arange(left.size) - np.repeat(np.cumsum(element_length) - element_length, element_length)
+    right = np.repeat(element_start, element_length) + offsets
+    mask = left != right
+    a, b = products[left[mask]], products[right[mask]]
+
+    base = int(products.max()) + 1
+    codes, counts = np.unique(a * base + b, return_counts=True)
+    return codes // base, codes % base, counts, orders_per_product
+
+
+def co_purchase_counts_python(pairs):
+    """То же, что co_purchase_counts_numpy, на чистом Python (списки вместо массивов)"""
+    baskets = defaultdict(set)
+    for order_id, product_id in pairs:
+        baskets[order_id].add(product_id)
+    orders_per_product = Counter()
+    pair_counts = Counter()
+    for products in baskets.values():
+        orders_per_product.update(products)
+        if 2 <= len(products) <= MAX_BASKET_SIZE:
+            pair_counts.update(permutations(products, 2))
+    a = [pair[0] for pair in pair_counts]
+    b = [pair[1] for pair in pair_counts]
+    return a, b, list(pair_counts.values()), orders_per_product
+
+
+def co_purchase_top_k(pairs, top_k=RELATED_TOP_K):
+    """{product_id: [(related_id, score), ...]} - топ-K по косинусной близости, при равенстве - по числу заказов"""
+    if np is not None:
+        a, b, counts, orders_per_product = co_purchase_counts_numpy(pairs)
+        if not len(a):
+            return {}
+        norms = np.sqrt(np.array([orders_per_product[p] for p in a.tolist()], dtype=float)
+                        * np.array([orders_per_product[p] for p in b.tolist()], dtype=float))
+        scores = counts / norms
+        order = np.lexsort((b, -counts, -scores, a))
+        rows = zip(a[order].tolist(), b[order].tolist(), scores[order].tolist())
+    else:
+        a, b, counts, orders_per_product = co_purchase_counts_python(pairs)
+        rows = sorted(
+            (
+                (pa, pb, count / math.sqrt(orders_per_product[pa] * orders_per_product[pb]), count)
+                for pa, pb, count in zip(a, b, counts)
+            ),
+            key=lambda row: (row[0], -row[2], -row[3], row[1]),
+        )
+        rows = ((pa, pb, score) for pa, pb, score, _ in rows)
+
+    result = defaultdict(list)
+    for product_id, related_id, score in rows:
+        if len(result[product_id]) < top_k:
+            result[product_id].append((related_id, score))
+    return result
+
+
+def build_related_products(top_k=RELATED_TOP_K, now=None, batch_size=1000):
+    """
+    Пересчитывает таблицу RelatedProduct для всех товаров.
+    Возвращает (количество товаров, количество связей по покупкам, количество связей по категории).
+    """
+    co_purchase = co_purchase_top_k(list(_order_product_pairs(now)), top_k)
+
+    # Кандидаты для дополнения: активные товары каждой категории по популярности
+    by_category = defaultdict(list)
+    active = Product.objects.filter(is_active=True).order_by(*SORT_ORDERINGS['popularity'])
+    for product_id, category_id in active.values_list('id', 'category_id'):
+        if len(by_category[category_id]) <= top_k:
+            by_category[category_id].append(product_id)
+
+    links = []
+    co_purchase_links = category_links = 0
+    products = Product.objects.values_list('id', 'category_id')
+    for product_id, category_id in products.iterator():
+        chosen = {product_id}
+        rank = 0
+        for related_id, score in co_purchase.get(product_id, ()):
+            links.append(RelatedProduct(
+                product_id=product_id, related_id=related_id, rank=rank, score=score,
+                source=RelatedProduct.SOURCE_CO_PURCHASE,
+            ))
+            chosen.add(related_id)
+            rank += 1
+            co_purchase_links += 1
+        for related_id in by_category.get(category_id, ()):
+            if rank >= top_k:
+                break
+            if related_id in chosen:
+                continue
+            links.append(RelatedProduct(
+                product_id=product_id, related_id=related_id, rank=rank, score=0,
+                source=RelatedProduct.SOURCE_CATEGORY,
+            ))
+            chosen.add(related_id)
+            rank += 1
+            category_links += 1
+
+    with transaction.atomic():
+        RelatedProduct.objects.all().delete()
+        RelatedProduct.objects.bulk_create(links, batch_size=batch_size)
+        # bulk_create не отправляет сигналы: страницы товаров и версию каталога сбрасываем явно
+        invalidate_pages('catalog')
+        invalidate_catalog_version()
+    return products.count(), co_purchase_links, category_links
+
+
+def get_related_products(product, limit=4):
+    """
+    Похожие товары для страницы товара: готовый список из RelatedProduct (один запрос по индексу).
+    Для новых товаров, которых еще нет в списке, - активные товары той же категории.
+    """
+    related = [
+        link.related for link in RelatedProduct.objects.filter(
+            product=product, related__is_active=True
+        ).select_related('related').order_by('rank')[:limit]
+    ]
+    if related:
+        return related
+    fallback = Product.objects.filter(is_active=True).exclude(id=product.id)
+    if product.category_id:
+        fallback = fallback.filter(category_id=product.category_id)
+    return list(fallback.order_by(*SORT_ORDERINGS['popularity'])[:limit])
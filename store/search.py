@@ -0,0 +1,220 @@
+"""
+Полнотекстовый поиск товаров по переводимым полям (название, описание, цвета на всех языках)
+
+- SQLite: виртуальная таблица FTS5 store_product_fts (rowid = id товара), ранжирование bm25
+- PostgreSQL: таблица store_product_search с tsvector (GIN) и pg_trgm по названиям, ранжирование ts_rank + similarity
+- Другие СУБД: запасной вариант через icontains по всем переводам
+
+Индекс обновляется инкрементально сигналами post_save/post_delete товара (см. signals.py),
+полная перестройка - командой rebuild_search_index.
+"""
+import re
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+SQLITE_TABLE = 'store_product_fts'
+POSTGRES_TABLE = 'store_product_search'
+
+# Веса колонок: совпадение в названии важнее, чем в цветах и описании
+SQLITE_RANK = f'-bm25({SQLITE_TABLE}, 10.0, 1.0, 2.0)'
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def get_languages():
+    """Языки, поля которых попадают в индекс"""
+    return getattr(settings, 'MODELTRANSLATION_LANGUAGES', None) or (settings.LANGUAGE_CODE,)
+
+
+def get_backend():
+    """Возвращает 'sqlite', 'postgresql' или None (полнотекстовый индекс недоступен)"""
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return connection.vendor
+    return None
+
+
+def _translated_values(product, field):
+    """Все непустые переводы поля товара без повторов"""
+    values = []
+    for lang in get_languages():
+        value = getattr(product, f'{field}_{lang}', None) or ''
+        if value and value not in values:
+            values.append(value)
+    if not values:
+        value = getattr(product, field, None) or ''
+        if value:
+            values.append(value)
+    return ' '.join(values)
+
+
+def build_document(product):
+    """Текст для индекса: (названия, описания, цвета) на всех языках"""
+    return (
+        _translated_values(product, 'name'),
+        _translated_values(product, 'description'),
+        _translated_values(product, 'available_colors'),
+    )
+
+
+def create_index(schema_connection=None):
+    """Создает таблицы индекса для текущей СУБД (вызывается из миграции)"""
+    conn = schema_connection or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} USING fts5('
+                f'name, description, colors, tokenize="unicode61 remove_diacritics 2")'
+            )
+        elif conn.vendor == 'postgresql':
+            cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {POSTGRES_TABLE} ('
+                f'product_id bigint PRIMARY KEY REFERENCES store_product(id) ON DELETE CASCADE, '
+                f'document tsvector NOT NULL, '
+                f'names text NOT NULL)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_document_gin '
+                f'ON {POSTGRES_TABLE} USING gin (document)'
+            )
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {POSTGRES_TABLE}_names_trgm '
+                f'ON {POSTGRES_TABLE} USING gin (names gin_trgm_ops)'
+            )
+
+
+def drop_index(schema_connection=None):
+    """Удаляет таблицы индекса (откат миграции)"""
+    conn = schema_connection or connection
+    with conn.cursor() as cursor:
+        if conn.vendor == 'sqlite':
+            cursor.execute(f'DROP TABLE IF EXISTS {SQLITE_TABLE}')
+        elif conn.vendor == 'postgresql':
+            cursor.execute(f'DROP TABLE IF EXISTS {POSTGRES_TABLE}')
+
+
+def _write_rows(cursor, vendor, rows):
+    """Записывает в индекс строки (product_id, names, descriptions, colors)"""
+    if vendor == 'sqlite':
+        cursor.executemany(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(
+            f'INSERT INTO {SQLITE_TABLE} (rowid, name, description, colors) VALUES (%s, %s, %s, %s)',
+            rows
+        )
+    elif vendor == 'postgresql':
+        cursor.executemany(
+            f"INSERT INTO {POSTGRES_TABLE} (product_id, document, names) VALUES (%s, "
+            f"setweight(to_tsvector('simple', %s), 'A') || "
+            f"setweight(to_tsvector('simple', %s), 'B') || "
+            f"setweight(to_tsvector('simple', %s), 'C'), %s) "
+            f"ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document, names = EXCLUDED.names",
+            [(pk, names, descriptions, colors, names) for pk, names, descriptions, colors in rows]
+        )
+
+
+def index_product(product):
+    """Добавляет или обновляет товар в индексе"""
+    vendor = get_backend()
+    if vendor is None:
+        return
+    with connection.cursor() as cursor:
+        _write_rows(cursor, vendor, [(product.pk, *build_document(product))])
+
+
+def remove_product(product_id):
+    """Удаляет товар из индекса"""
+    vendor = get_backend()
+    if vendor is None:
+        return
+    with connection.cursor() as cursor:
+        if vendor == 'sqlite':
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [product_id])
+        elif vendor == 'postgresql':
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE product_id = %s', [product_id])
+
+
+def rebuild_index(products, batch_size=500):
+    """
+    Полностью перестраивает индекс по переданным товарам.
+    Возвращает количество проиндексированных товаров.
+    """
+    vendor = get_backend()
+    if vendor is None:
+        return 0
+    count = 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_TABLE if vendor == "sqlite" else POSTGRES_TABLE}')
+        batch = []
+        for product in products.iterator(chunk_size=batch_size):
+            batch.append((product.pk, *build_document(product)))
+            if len(batch) >= batch_size:
+                _write_rows(cursor, vendor, batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            _write_rows(cursor, vendor, batch)
+            count += len(batch)
+    return count
+
+
+def tokenize(query):
+    """Разбивает поисковую строку на слова (без операторов FTS)"""
+    return TOKEN_RE.findall(query or '')
+
+
+def _fallback_filter(queryset, tokens):
+    """Поиск без индекса: каждое слово должно встретиться в любом переводе названия или описания"""
+    for token in tokens:
+        condition = Q()
+        for lang in get_languages():
+            condition |= Q(**{f'name_{lang}__icontains': token})
+            condition |= Q(**{f'description_{lang}__icontains': token})
+        queryset = queryset.filter(condition)
+    return queryset
+
+
+def search_products(queryset, query):
+    """
+    Фильтрует товары по поисковой строке и добавляет аннотацию search_rank (больше - релевантнее).
+    Пустая строка (или строка без слов) возвращает queryset без изменений.
+    """
+    tokens = tokenize(query)
+    if not tokens:
+        return queryset
+
+    vendor = get_backend()
+    if vendor == 'sqlite':
+        # Каждое слово - префиксный термин в кавычках: пользовательский ввод не интерпретируется как синтаксис FTS5
+        match = ' '.join('"{}"*'.format(token.replace('"', '')) for token in tokens)
+        return queryset.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s', [match])
+        ).annotate(search_rank=RawSQL(
+            f'SELECT {SQLITE_RANK} FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s AND rowid = "store_product"."id"',
+            [match]
+        ))
+
+    if vendor == 'postgresql':
+        # Префиксный tsquery по всем словам + триграммы по названиям для опечаток
+        tsquery = ' & '.join(f"{token}:*" for token in tokens)
+        text = ' '.join(tokens)
+        return queryset.filter(
+            id__in=RawSQL(
+                f"SELECT product_id FROM {POSTGRES_TABLE} "
+                f"WHERE document @@ to_tsquery('simple', %s) OR names %% %s",
+                [tsquery, text]
+            )
+        ).annotate(search_rank=RawSQL(
+            f"SELECT ts_rank(document, to_tsquery('simple', %s)) + similarity(names, %s) "
+            f"FROM {POSTGRES_TABLE} WHERE product_id = \"store_product\".\"id\"",
+            [tsquery, text]
+        ))
+
+    return _fallback_filter(queryset, tokens)
+
+
+def is_ranked(queryset):
+    """Есть ли у queryset аннотация релевантности"""
+    return 'search_rank' in queryset.query.annotations
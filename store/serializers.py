@@ -1,7 +1,61 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, ContactMessage
 
 
+def parse_field_list(value):
+    """'id, name,price' -> ['id', 'name', 'price']"""
+    return [name.strip() for name in (value or '').split(',') if name.strip()]
+
+
+def get_requested_fields(request, meta, fields_param='fields', expand_param='expand'):
+    """
+    Поля, выбранные параметрами запроса (?fields= и ?expand=), или None - все поля.
+    meta - класс Meta сериализатора (field_sets, expandable_fields).
+    """
+    if request is None:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    names = parse_field_list(params.get(fields_param))
+    if not names:
+        return None
+    field_sets = getattr(meta, 'field_sets', {})
+    requested = set()
+    for name in names:
+        requested.update(field_sets.get(name, (name,)))
+    expandable = getattr(meta, 'expandable_fields', ())
+    requested.update(name for name in parse_field_list(params.get(expand_param)) if name in expandable)
+    return requested
+
+
+class DynamicFieldsMixin:
+    """
+    Выбор полей сериализатора параметрами запроса:
+    ?fields=id,name,price - только перечисленные поля (или имя набора из Meta.field_sets, например card)
+    ?expand=category,images - добавить к выбранным полям вложенные связи из Meta.expandable_fields
+    Без ?fields= сериализатор возвращает все поля, как раньше.
+    Для вложенного сериализатора имена параметров задаются fields_param/expand_param
+    (например, product_fields в корзине), чтобы параметры верхнего уровня на него не влияли.
+    """
+
+    def __init__(self, *args, fields_param='fields', expand_param='expand', **kwargs):
+        self.fields_param = fields_param
+        self.expand_param = expand_param
+        super().__init__(*args, **kwargs)
+
+    def get_requested_fields(self):
+        """Множество выбранных полей или None (все поля)"""
+        return get_requested_fields(self.context.get('request'), self.Meta, self.fields_param, self.expand_param)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        requested = self.get_requested_fields()
+        if requested is None:
+            return fields
+        # Невыбранные поля не вычисляются вовсе (включая SerializerMethodField и вложенные сериализаторы)
+        return {name: field for name, field in fields.items() if name in requested}
+
+
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
@@ -14,7 +68,7 @@ class ProductImageSerializer(serializers.ModelSerializer):
         fields = ['id', 'image']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     category = CategorySerializer(read_only=True)
     category_id = serializers.PrimaryKeyRelatedField(
         queryset=Category.objects.all(),
@@ -33,6 +87,11 @@ class ProductSerializer(serializers.ModelSerializer):
             'available_sizes', 'available_colors', 'stock', 'is_active',
             'rating', 'reviews_count', 'images', 'discount_percent', 'created_at'
         ]
+        # Наборы полей для ?fields=: card - компактная карточка для списков
+        field_sets = {
+            'card': ['id', 'slug', 'name', 'price', 'old_price', 'image_display', 'discount_percent'],
+        }
+        expandable_fields = ['category', 'images', 'description']
 
     def get_discount_percent(self, obj):
         if obj.old_price and obj.old_price > obj.price:
@@ -53,7 +112,7 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 class CartItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = ProductSerializer(read_only=True, fields_param='product_fields', expand_param='product_expand')
     product_id = serializers.PrimaryKeyRelatedField(
         queryset=Product.objects.all(),
         source='product',
@@ -79,7 +138,7 @@ class CartSerializer(serializers.ModelSerializer):
 
 
 class OrderItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer(read_only=True)
+    product = ProductSerializer(read_only=True, fields_param='product_fields', expand_param='product_expand')
     total = serializers.ReadOnlyField()
 
     class Meta:
@@ -159,19 +218,22 @@ class CreateOrderSerializer(serializers.ModelSerializer):
             total += product.price * quantity
 
         validated_data['total'] = total
-        order = Order.objects.create(**validated_data)
-
-        # Создание элементов заказа
-        for item_data in items_data:
-            product = Product.objects.get(id=item_data['product_id'])
-            OrderItem.objects.create(
-                order=order,
-                product=product,
-                quantity=item_data['quantity'],
-                price=product.price,
-                size=item_data.get('size', ''),
-                color=item_data.get('color', '')
-            )
+        # Заказ и позиции - одной транзакцией: пересчет популярности товаров заказа
+        # выполняется один раз после коммита (signals._refresh_popularity_on_commit)
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+
+            # Создание элементов заказа
+            for item_data in items_data:
+                product = Product.objects.get(id=item_data['product_id'])
+                OrderItem.objects.create(
+                    order=order,
+                    product=product,
+                    quantity=item_data['quantity'],
+                    price=product.price,
+                    size=item_data.get('size', ''),
+                    color=item_data.get('color', '')
+                )
         
         # Обновляем заказ из БД, чтобы убедиться, что товары связаны
         order.refresh_from_db()
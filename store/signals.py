@@ -1,13 +1,58 @@
 """
-Сигналы Django для отправки уведомлений в Telegram
+Сигналы Django: уведомления в Telegram, инвалидация снимка конфигурации, кэша страниц и версии каталога, поисковый индекс,
+подсказки поиска и популярность товаров
 """
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, pre_save, post_delete
 from django.dispatch import receiver
-from .models import Order
+from .config_loader import invalidate_config
+from . import search
+from .facets import sync_product_facets
+from .catalog import bump_facets_version
+from .suggest import invalidate_suggest_index
+from .page_cache import PAGE_CACHE_TAGS, invalidate_page_cache
+from .conditional import invalidate_catalog_version
+from .popularity import refresh_popularity, EXCLUDED_ORDER_STATUSES
+from .models import (
+    Order, OrderItem, Product, Category, Config, StoreConfig, ContactConfig, SocialConfig, HeroConfig,
+    Feature, AboutConfig, SEOConfig, ThemeConfig, ProductFeatureConfig, Partner, ProductImage
+)
 import logging
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Модели, из которых строится снимок конфигурации (config_loader.get_config_snapshot)
+CONFIG_MODELS = (
+    Config, StoreConfig, ContactConfig, SocialConfig, HeroConfig,
+    Feature, AboutConfig, SEOConfig, ThemeConfig, ProductFeatureConfig, Partner,
+)
+
+for _model in CONFIG_MODELS:
+    post_save.connect(invalidate_config, sender=_model, dispatch_uid=f'invalidate_config_save_{_model.__name__}')
+    post_delete.connect(invalidate_config, sender=_model, dispatch_uid=f'invalidate_config_delete_{_model.__name__}')
+
+# Модели, от которых зависят счетчики фасетов каталога (catalog.get_facet_counts).
+# Сохранение товара сбрасывает фасеты в update_product_facets - после синхронизации ProductFacet
+post_save.connect(bump_facets_version, sender=Category, dispatch_uid='bump_facets_save_Category')
+for _model in (Product, Category):
+    post_delete.connect(bump_facets_version, sender=_model, dispatch_uid=f'bump_facets_delete_{_model.__name__}')
+
+# Модели, названия которых попадают в индекс подсказок поиска (suggest.get_index)
+for _model in (Product, Category):
+    post_save.connect(invalidate_suggest_index, sender=_model, dispatch_uid=f'invalidate_suggest_save_{_model.__name__}')
+    post_delete.connect(invalidate_suggest_index, sender=_model, dispatch_uid=f'invalidate_suggest_delete_{_model.__name__}')
+
+# Модели, от которых зависят закэшированные страницы витрины (page_cache.PAGE_CACHE_TAGS)
+for _model in {model for models in PAGE_CACHE_TAGS.values() for model in models}:
+    post_save.connect(invalidate_page_cache, sender=_model, dispatch_uid=f'invalidate_pages_save_{_model.__name__}')
+    post_delete.connect(invalidate_page_cache, sender=_model, dispatch_uid=f'invalidate_pages_delete_{_model.__name__}')
+
+# Модели, от которых зависят ETag / Last-Modified списков товаров и категорий (conditional.catalog_state)
+for _model in (Product, Category, ProductImage):
+    post_save.connect(invalidate_catalog_version, sender=_model, dispatch_uid=f'invalidate_catalog_save_{_model.__name__}')
+    post_delete.connect(invalidate_catalog_version, sender=_model, dispatch_uid=f'invalidate_catalog_delete_{_model.__name__}')
+
 
 @receiver(pre_save, sender=Order)
 def save_old_status(sender, instance, **kwargs):
@@ -37,3 +82,87 @@ def notify_order_status_change(sender, instance, created, **kwargs):
             telegram_notifier.notify_status_change(instance, old_status=old_status)
         except Exception as e:
             logger.error(f"Ошибка отправки уведомления об изменении статуса в Telegram: {e}")
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_index(sender, instance, **kwargs):
+    """Обновляет товар в полнотекстовом индексе"""
+    try:
+        search.index_product(instance)
+    except Exception as e:
+        logger.error(f"Ошибка обновления поискового индекса для товара #{instance.pk}: {e}")
+
+
+@receiver(post_save, sender=Product)
+def update_product_facets(sender, instance, raw=False, **kwargs):
+    """
+    Синхронизирует нормализованные размеры/цвета (ProductFacet) со строковыми полями товара
+    и после этого сбрасывает кэш счетчиков фасетов
+    """
+    if not raw:
+        sync_product_facets(instance)
+    bump_facets_version()
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_search_index(sender, instance, **kwargs):
+    """Удаляет товар из полнотекстового индекса"""
+    try:
+        search.remove_product(instance.pk)
+    except Exception as e:
+        logger.error(f"Ошибка удаления товара #{instance.pk} из поискового индекса: {e}")
+
+
+# Товары, ожидающие пересчета популярности в текущем потоке: все сигналы одной транзакции
+# (например, N позиций заказа) собираются в один вызов refresh_popularity после коммита
+_pending_popularity = threading.local()
+
+
+def _refresh_pending_popularity():
+    """Пересчитывает все накопленные товары одним вызовом; следующие колбэки той же транзакции - пустые"""
+    product_ids = getattr(_pending_popularity, 'ids', None)
+    if not product_ids:
+        return
+    _pending_popularity.ids = set()
+    try:
+        refresh_popularity(sorted(product_ids))
+    except Exception as e:
+        logger.error(f"Ошибка пересчета популярности товаров {sorted(product_ids)}: {e}")
+
+
+def _refresh_popularity_on_commit(product_ids):
+    """Пересчет популярности после фиксации транзакции (ошибка не должна ломать заказ или сохранение товара)"""
+    if not hasattr(_pending_popularity, 'ids'):
+        _pending_popularity.ids = set()
+    _pending_popularity.ids.update(product_ids)
+    # Колбэк регистрируется каждый раз: после отката транзакции ее колбэки отбрасываются,
+    # а накопленные id пересчитает первый колбэк следующей
+    transaction.on_commit(_refresh_pending_popularity)
+
+
+@receiver(post_save, sender=Product)
+def update_product_popularity(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Пересчитывает популярность товара при изменении рейтинга или числа отзывов"""
+    if raw or (update_fields is not None and not {'rating', 'reviews_count'} & set(update_fields)):
+        return
+    _refresh_popularity_on_commit([instance.pk])
+
+
+@receiver(post_save, sender=OrderItem)
+def update_ordered_product_popularity(sender, instance, created, raw=False, **kwargs):
+    """Новая позиция заказа увеличивает популярность товара"""
+    if raw or not created:
+        return
+    _refresh_popularity_on_commit([instance.product_id])
+
+
+@receiver(post_save, sender=Order)
+def update_cancelled_order_popularity(sender, instance, created, **kwargs):
+    """Отмена заказа (или ее снятие) меняет популярность товаров заказа"""
+    if created:
+        return
+    old_status = getattr(instance, '_old_status', None)
+    if old_status == instance.status:
+        return
+    if (old_status in EXCLUDED_ORDER_STATUSES) != (instance.status in EXCLUDED_ORDER_STATUSES):
+        _refresh_popularity_on_commit(list(instance.items.values_list('product_id', flat=True)))
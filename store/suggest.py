@@ -0,0 +1,157 @@
+"""
+Подсказки поиска (typeahead) для /api/products/suggest/?q=
+
+Индекс хранится в памяти процесса: отсортированный список ключей (названия товаров и категорий на всех языках
+MODELTRANSLATION_LANGUAGES, в нижнем регистре, начиная с каждого слова) и поиск по префиксу через bisect.
+Запрос на каждое нажатие клавиши не обращается к БД.
+
+Индекс строится лениво при первом запросе и перестраивается после изменения товаров или категорий:
+сигналы увеличивают версию в кэше (SUGGEST_VERSION_KEY), и каждый процесс при следующем запросе
+сравнивает ее со своей. С общим кэшем (Redis, Memcached) это работает для всех воркеров.
+"""
+import re
+import threading
+from bisect import bisect_left
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.translation import get_language
+from .search import get_languages
+
+SUGGEST_VERSION_KEY = 'suggest_index_version'
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+# Сколько совпадений по префиксу просматривается перед ранжированием (ограничивает время ответа)
+SUGGEST_SCAN_LIMIT = 500
+
+WORD_START_RE = re.compile(r'(?<!\w)\w', re.UNICODE)
+SPACES_RE = re.compile(r'\s+')
+
+
+def normalize(text):
+    """Ключ для сравнения: нижний регистр без учета ё/е и лишних пробелов"""
+    return SPACES_RE.sub(' ', (text or '').casefold().replace('ё', 'е')).strip()
+
+
+def _display_names(row, prefix, languages):
+    """{язык: название} с fallback на остальные языки, как у переводимых полей"""
+    names = {}
+    for lang in languages:
+        for candidate in (lang,) + tuple(other for other in languages if other != lang):
+            value = row[f'{prefix}{candidate}']
+            if value:
+                names[lang] = value
+                break
+    return names
+
+
+class SuggestIndex:
+    """
+    Отсортированный список (ключ, вес, тип, id) и записи для ответа.
+    Ключ - название начиная с каждого слова: "Белая футболка" находится и по "бел", и по "фут".
+    """
+
+    def __init__(self, products, categories, languages, version=None):
+        self.version = version
+        self.languages = languages
+        self.records = {}
+        entries = set()
+        for kind, rows in (('product', products), ('category', categories)):
+            for row in rows:
+                names = _display_names(row, 'name_', languages)
+                self.records[kind, row['id']] = {**row, 'names': names}
+                for name in set(names.values()):
+                    key = normalize(name)
+                    for match in WORD_START_RE.finditer(key):
+                        # Вес 0 - совпадение с начала названия, 1 - с начала другого слова
+                        entries.add((key[match.start():], 0 if match.start() == 0 else 1, kind, row['id']))
+        entries = sorted(entries)
+        self.keys = [entry[0] for entry in entries]
+        self.entries = entries
+
+    def search(self, query, limit=SUGGEST_LIMIT, language=None):
+        """{'products': [...], 'categories': [...]} - до limit записей каждого типа"""
+        query = normalize(query)
+        result = {'products': [], 'categories': []}
+        if not query:
+            return result
+
+        matches = {}
+        start = bisect_left(self.keys, query)
+        for key, weight, kind, object_id in self.entries[start:start + SUGGEST_SCAN_LIMIT]:
+            if not key.startswith(query):
+                break
+            if weight < matches.get((kind, object_id), 2):
+                matches[kind, object_id] = weight
+
+        language = language if language in self.languages else self.languages[0]
+        ranked = sorted(
+            matches.items(),
+            key=lambda item: (item[1], -self.records[item[0]]['popularity_score'], item[0][1]),
+        )
+        for (kind, object_id), _ in ranked:
+            items = result['products' if kind == 'product' else 'categories']
+            if len(items) < limit:
+                items.append(self._serialize(kind, self.records[kind, object_id], language))
+        return result
+
+    @staticmethod
+    def _serialize(kind, record, language):
+        item = {'id': record['id'], 'name': record['names'].get(language, ''), 'slug': record['slug']}
+        if kind == 'product':
+            item['price'] = record['price']
+        return item
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def build_index(version=None):
+    """Загружает названия активных товаров и категорий (2 запроса) и строит индекс"""
+    from .models import Category, Product
+    languages = tuple(get_languages())
+    name_fields = [f'name_{lang}' for lang in languages]
+    products = [
+        {**row, 'price': '{:f}'.format(row['price'])}
+        for row in Product.objects.filter(is_active=True).values('id', 'slug', 'price', 'popularity_score', *name_fields)
+    ]
+    categories = [
+        {**row, 'popularity_score': 0}
+        for row in Category.objects.values('id', 'slug', *name_fields)
+    ]
+    return SuggestIndex(products, categories, languages, version)
+
+
+def get_index():
+    """Индекс текущего процесса; перестраивается, если версия в кэше изменилась"""
+    global _index
+    version = cache.get(SUGGEST_VERSION_KEY, 0)
+    index = _index
+    if index is not None and index.version == version:
+        return index
+    with _index_lock:
+        if _index is None or _index.version != version:
+            _index = build_index(version)
+        return _index
+
+
+def suggest(query, limit=SUGGEST_LIMIT):
+    """Подсказки для строки поиска на текущем языке"""
+    return get_index().search(query, limit, get_language())
+
+
+def _bump_version():
+    if cache.add(SUGGEST_VERSION_KEY, 1, None):
+        return
+    try:
+        cache.incr(SUGGEST_VERSION_KEY)
+    except ValueError:
+        cache.set(SUGGEST_VERSION_KEY, 1, None)
+
+
+def invalidate_suggest_index(**kwargs):
+    """
+    Помечает индекс подсказок устаревшим во всех процессах (обработчик сигналов товаров и категорий).
+    Версия увеличивается после коммита, иначе индекс может перестроиться по незафиксированным данным.
+    """
+    transaction.on_commit(_bump_version)
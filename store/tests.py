@@ -0,0 +1,176 @@
+import json
+import threading
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+from django.conf import settings
+from django.db import connection, close_old_connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from . import config_loader
+from .catalog import get_facet_counts
+from .models import Category, Product, ProductImage, Cart, CartItem, Order, OrderItem, StoreConfig
+
+
+class CartAddItemConcurrencyTests(TransactionTestCase):
+    """
+    add_item под конкуренцией: несколько потоков одновременно добавляют один и тот же товар в одну корзину.
+    TransactionTestCase - потоки работают со своими соединениями и должны видеть зафиксированные данные.
+    """
+    threads_count = 8
+    adds = 10
+    quantity = 2
+
+    def setUp(self):
+        if connection.vendor == 'sqlite':
+            # Писатели SQLite ждут блокировку, а не падают сразу с "database is locked".
+            # Настройки соединения общие для процесса - после теста возвращаем прежние
+            options = connection.settings_dict.setdefault('OPTIONS', {})
+            original = dict(options)
+            self.addCleanup(self._restore_options, options, original)
+            options.setdefault('timeout', 30)
+        category = Category.objects.create(name='Concurrency', slug='concurrency')
+        self.product = Product.objects.create(
+            name='Concurrency', slug='concurrency', category=category, price=Decimal('100.00')
+        )
+        self.session = import_module(settings.SESSION_ENGINE).SessionStore()
+        self.session.create()
+        self.cart = Cart.objects.create(session_key=self.session.session_key)
+
+    @staticmethod
+    def _restore_options(options, original):
+        options.clear()
+        options.update(original)
+
+    def test_parallel_adds_keep_every_unit_in_one_line(self):
+        errors = []
+        barrier = threading.Barrier(self.threads_count)
+        payload = json.dumps({'product_id': self.product.id, 'quantity': self.quantity})
+
+        def worker():
+            client = Client()
+            client.cookies[settings.SESSION_COOKIE_NAME] = self.session.session_key
+            try:
+                barrier.wait()
+                for _ in range(self.adds):
+                    response = client.post('/api/cart/add_item/', payload, content_type='application/json')
+                    if response.status_code != 201:
+                        errors.append(f'{response.status_code}: {response.content[:200]!r}')
+            finally:
+                close_old_connections()
+
+        workers = [threading.Thread(target=worker) for _ in range(self.threads_count)]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        quantities = list(CartItem.objects.filter(cart=self.cart).values_list('quantity', flat=True))
+        self.assertEqual(quantities, [self.threads_count * self.adds * self.quantity])
+
+
+class ProductApiQueryCountTests(TestCase):
+    """
+    Количество запросов API товаров не зависит от размера страницы: страница из 1 товара и из всех товаров
+    выполняет одинаковое число запросов (категории и изображения загружаются без N+1)
+    """
+    products_count = 30
+
+    @classmethod
+    def setUpTestData(cls):
+        categories = [Category.objects.create(name=f'Category {i}', slug=f'category-{i}') for i in range(3)]
+        for i in range(cls.products_count):
+            product = Product.objects.create(
+                name=f'Product {i}', slug=f'product-{i}', category=categories[i % 3],
+                price=Decimal('1000.00') + i,
+            )
+            for j in range(2):
+                ProductImage.objects.create(product=product, image=f'products/product-{i}-{j}.jpg')
+        cls.category = categories[0]
+
+    def assertSameQueryCount(self, small_url, large_url):
+        client = Client()
+        client.get(large_url)  # прогрев кэшей конфигурации и фасетов
+        with CaptureQueriesContext(connection) as small:
+            self.assertEqual(client.get(small_url).status_code, 200)
+        with CaptureQueriesContext(connection) as large:
+            self.assertEqual(client.get(large_url).status_code, 200)
+        self.assertEqual(
+            len(large.captured_queries), len(small.captured_queries),
+            '\n'.join(query['sql'] for query in large.captured_queries),
+        )
+
+    def test_list(self):
+        self.assertSameQueryCount('/api/products/?page_size=1', '/api/products/?page_size=100')
+
+    def test_list_cursor(self):
+        self.assertSameQueryCount('/api/products/?cursor=&page_size=1', '/api/products/?cursor=&page_size=100')
+
+    def test_popular(self):
+        # popular без размера страницы: одна категория против всех товаров
+        self.assertSameQueryCount(f'/api/products/popular/?category={self.category.slug}', '/api/products/popular/')
+
+    def test_card_with_expanded_relations(self):
+        self.assertSameQueryCount(
+            '/api/products/?page_size=1&fields=card&expand=category,images',
+            '/api/products/?page_size=100&fields=card&expand=category,images',
+        )
+
+
+class FacetCountsInvalidationTests(TestCase):
+    """Кэш счетчиков фасетов сбрасывается после коммита и после синхронизации ProductFacet"""
+
+    def test_counts_follow_committed_sizes(self):
+        category = Category.objects.create(name='Facets', slug='facets')
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='Facets', slug='facets', category=category, price=Decimal('100.00'), available_sizes='M'
+            )
+        sizes = {item['value']: item['count'] for item in get_facet_counts({})['sizes']}
+        self.assertEqual((sizes['M'], sizes['L']), (1, 0))
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.available_sizes = 'L'
+            product.save()
+            # До коммита версия не меняется: пересчет по незафиксированным данным не попадает в кэш
+            sizes = {item['value']: item['count'] for item in get_facet_counts({})['sizes']}
+            self.assertEqual((sizes['M'], sizes['L']), (1, 0))
+        for callback in callbacks:
+            callback()
+
+        sizes = {item['value']: item['count'] for item in get_facet_counts({})['sizes']}
+        self.assertEqual((sizes['M'], sizes['L']), (0, 1))
+
+
+class ConfigSnapshotFallbackTests(TestCase):
+    """Конфигурация, собранная из config.json из-за ошибки БД, не остается в снимке процесса"""
+
+    def test_fallback_is_not_cached(self):
+        config_loader.invalidate_config()
+        with mock.patch.object(StoreConfig.objects, 'filter', side_effect=Exception('database is unavailable')):
+            self.assertTrue(config_loader.get_config_snapshot()['fallback'])
+        self.assertEqual(config_loader._config_snapshots, {})
+
+        self.assertFalse(config_loader.get_config_snapshot()['fallback'])
+        self.assertNotEqual(config_loader._config_snapshots, {})
+
+
+class OrderPopularityRefreshTests(TestCase):
+    """Позиции заказа пересчитывают популярность одним вызовом refresh_popularity после коммита"""
+
+    def test_one_refresh_per_order(self):
+        category = Category.objects.create(name='Popularity', slug='popularity')
+        products = [
+            Product.objects.create(name=f'Popularity {i}', slug=f'popularity-{i}', category=category, price=Decimal('100.00'))
+            for i in range(3)
+        ]
+        with mock.patch('store.signals.refresh_popularity') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                order = Order.objects.create(
+                    session_key='popularity', first_name='A', last_name='B', email='a@example.com',
+                    phone='1', address='Street', total=Decimal('300.00'), payment_method='cash',
+                )
+                for product in products:
+                    OrderItem.objects.create(order=order, product=product, quantity=1, price=product.price)
+        refresh.assert_called_once_with(sorted(product.pk for product in products))
@@ -2,30 +2,79 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from rest_framework.exceptions import ValidationError
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
 from django.utils import timezone
 from django.core.cache import cache
+from django.db import IntegrityError
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils.decorators import method_decorator
 from datetime import timedelta
 from .models import Category, Product, Cart, CartItem, Order, ContactMessage
+from .catalog import (
+    parse_filters, apply_filters, get_facet_counts,
+    get_sort, apply_sort, InvalidSort, SORT_ORDERINGS
+)
+from .pagination import ProductPagination
+from .conditional import conditional, category_validators, product_list_validators, product_detail_validators
+from .cart_batch import CartBatchError, parse_operations, apply_operations
+from .suggest import SUGGEST_LIMIT, SUGGEST_MAX_LIMIT, suggest
+from .fast_serializers import use_fast_serializer, serialize_categories, serialize_products, serialize_cart
 from .serializers import (
     CategorySerializer, ProductSerializer, CartSerializer,
     CartItemSerializer, OrderSerializer, CreateOrderSerializer
 )
 
 
+def prefetch_cart_items(cart):
+    """Загружает позиции корзины с товарами, категориями и изображениями (3 запроса на любую корзину)"""
+    prefetch_related_objects([cart], Prefetch(
+        'items',
+        queryset=CartItem.objects.select_related('product__category').prefetch_related('product__images'),
+    ))
+
+
+def empty_cart_data():
+    """Ответ для посетителя, у которого еще нет корзины (в форме CartSerializer), без записи в БД"""
+    return {
+        'id': None,
+        'session_key': None,
+        'items': [],
+        'total': 0,
+        'items_count': 0,
+        'created_at': None,
+        'updated_at': None,
+    }
+
+
+# ETag / Last-Modified: 304 без сериализации, если категории не менялись
+@method_decorator(conditional(category_validators), name='list')
+@method_decorator(conditional(category_validators), name='retrieve')
 class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
 
+    def list(self, request, *args, **kwargs):
+        if not use_fast_serializer('categories'):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_categories(page, request))
+        return Response(serialize_categories(queryset, request))
+
 
+# ETag / Last-Modified: 304 без сериализации, если отфильтрованные товары, категории и изображения не менялись
+@method_decorator(conditional(product_list_validators), name='list')
+@method_decorator(conditional(product_detail_validators), name='retrieve')
 class ProductViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Product.objects.filter(is_active=True)
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
     lookup_field = 'slug'
+    pagination_class = ProductPagination  # ?cursor= включает keyset-пагинацию
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -33,41 +82,64 @@ class ProductViewSet(viewsets.ReadOnlyModelViewSet):
         return context
 
     def get_queryset(self):
+        # Категория - JOIN, изображения - один дополнительный запрос на всю страницу (без N+1 в ProductSerializer).
+        # Связи загружаются только если попали в ответ (?fields= / ?expand=)
         queryset = Product.objects.filter(is_active=True)
+        fields = self.get_serializer().fields
+        if 'category' in fields:
+            queryset = queryset.select_related('category')
+        if 'images' in fields:
+            queryset = queryset.prefetch_related('images')
         
-        # Фильтрация по категории
-        category = self.request.query_params.get('category', None)
-        if category:
-            queryset = queryset.filter(category__slug=category)
+        # Фильтры: категория, цена, размер, цвет, полнотекстовый поиск (общие с HTML-каталогом)
+        queryset = apply_filters(queryset, parse_filters(self.request.query_params))
         
-        # Фильтрация по цене
-        min_price = self.request.query_params.get('min_price', None)
-        max_price = self.request.query_params.get('max_price', None)
-        if min_price:
-            queryset = queryset.filter(price__gte=min_price)
-        if max_price:
-            queryset = queryset.filter(price__lte=max_price)
-        
-        # Поиск
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) | Q(description__icontains=search)
-            )
-        
-        # Сортировка
-        ordering = self.request.query_params.get('ordering', '-created_at')
-        queryset = queryset.order_by(ordering)
-        
-        return queryset
+        # Сортировка только из списка поддерживаемых режимов (при поиске без явной сортировки - по релевантности)
+        params = self.request.query_params
+        try:
+            sort = get_sort(params, 'ordering' if 'ordering' in params else 'sort')
+        except InvalidSort as exc:
+            raise ValidationError({'ordering': [
+                f'Неизвестная сортировка "{exc}". Допустимые значения: {", ".join(SORT_ORDERINGS)}.'
+            ]})
+        return apply_sort(queryset, sort)
+
+    def list(self, request, *args, **kwargs):
+        if not use_fast_serializer('products'):
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serialize_products(page, request))
+        return Response(serialize_products(queryset, request))
 
     @action(detail=False, methods=['get'])
     def popular(self, request):
         """Популярные товары"""
-        products = self.get_queryset().order_by('-rating', '-reviews_count')[:8]
+        products = self.get_queryset().order_by(*SORT_ORDERINGS['popularity'])[:8]
+        if use_fast_serializer('products'):
+            return Response(serialize_products(products, request))
         serializer = self.get_serializer(products, many=True)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Количество товаров по категориям, размерам, цветам и диапазонам цен для текущих фильтров"""
+        return Response(get_facet_counts(parse_filters(request.query_params)))
+
+    @action(detail=False, methods=['get'], authentication_classes=[])
+    def suggest(self, request):
+        """
+        Подсказки для строки поиска: товары и категории, в названии которых есть слово, начинающееся с ?q=.
+        Отвечает из индекса в памяти процесса, без запросов к БД (аутентификация не нужна и не загружает сессию)
+        """
+        try:
+            limit = int(request.query_params.get('limit', SUGGEST_LIMIT))
+        except ValueError:
+            limit = SUGGEST_LIMIT
+        limit = min(max(limit, 1), SUGGEST_MAX_LIMIT)
+        return Response(suggest(request.query_params.get('q', ''), limit))
+
 
 class CartViewSet(viewsets.ModelViewSet):
     serializer_class = CartSerializer
@@ -76,8 +148,7 @@ class CartViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         session_key = self.request.session.session_key
         if not session_key:
-            self.request.session.create()
-            session_key = self.request.session.session_key
+            return Cart.objects.none()
         return Cart.objects.filter(session_key=session_key)
 
     def cleanup_old_carts(self):
@@ -113,30 +184,39 @@ class CartViewSet(viewsets.ModelViewSet):
             cache.delete(cache_key)
             print(f"Ошибка при очистке старых корзин: {e}")
 
+    def get_cart(self):
+        """Корзина текущей сессии или None (сессия и корзина не создаются)"""
+        return Cart.get_for_session(self.request.session)
+
     def get_or_create_cart(self):
-        # Автоматически очищаем старые корзины при каждом запросе (с ограничением частоты)
+        # Автоматически очищаем старые корзины при каждом создании корзины (с ограничением частоты)
         self.cleanup_old_carts()
-        
-        session_key = self.request.session.session_key
-        if not session_key:
-            self.request.session.create()
-            session_key = self.request.session.session_key
-        
-        cart, created = Cart.objects.get_or_create(session_key=session_key)
-        return cart
+        return Cart.get_for_session(self.request.session, create=True)
 
     @action(detail=False, methods=['get'])
     def current(self, request):
-        """Получить текущую корзину"""
-        cart = self.get_or_create_cart()
+        """Получить текущую корзину (пустая корзина без сессии и записи в БД, если товаров еще не добавляли)"""
+        return self.cart_response(self.get_cart())
+
+    def cart_response(self, cart):
+        """Корзина целиком (позиции с товарами - постоянное число запросов)"""
+        if cart is None:
+            return Response(empty_cart_data())
+        prefetch_cart_items(cart)
+        if use_fast_serializer('cart'):
+            return Response(serialize_cart(cart, self.request))
         serializer = self.get_serializer(cart)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """Количество товаров и сумма корзины для значка в шапке (один запрос, без сериализации позиций)"""
+        return Response(Cart.get_summary(request.session))
+
     @action(detail=False, methods=['post'])
     def add_item(self, request):
         """Добавить товар в корзину"""
         try:
-            cart = self.get_or_create_cart()
             product_id = request.data.get('product_id')
             
             if not product_id:
@@ -157,26 +237,16 @@ class CartViewSet(viewsets.ModelViewSet):
             size = request.data.get('size', '')
             color = request.data.get('color', '')
 
-            try:
-                product = Product.objects.get(id=product_id, is_active=True)
-            except Product.DoesNotExist:
+            # Атомарный upsert: проверка товара, вставка или увеличение количества - одним запросом
+            cart = self.get_or_create_cart()
+            item_id = CartItem.add(cart, product_id, quantity, size, color)
+            if item_id is None:
                 return Response(
                     {'error': f'Product with id {product_id} not found or is inactive'},
                     status=status.HTTP_404_NOT_FOUND
                 )
 
-            cart_item, created = CartItem.objects.get_or_create(
-                cart=cart,
-                product=product,
-                size=size,
-                color=color,
-                defaults={'quantity': quantity}
-            )
-
-            if not created:
-                cart_item.quantity += quantity
-                cart_item.save()
-
+            cart_item = CartItem.objects.select_related('product__category').prefetch_related('product__images').get(pk=item_id)
             serializer = CartItemSerializer(cart_item)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -188,7 +258,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['put'])
     def update_item(self, request):
         """Обновить количество товара в корзине"""
-        cart = self.get_or_create_cart()
+        cart = self.get_cart()
         item_id = request.data.get('item_id')
         quantity = int(request.data.get('quantity', 1))
 
@@ -202,7 +272,7 @@ class CartViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['delete'])
     def remove_item(self, request):
         """Удалить товар из корзины"""
-        cart = self.get_or_create_cart()
+        cart = self.get_cart()
         item_id = request.query_params.get('item_id')
 
         cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
@@ -210,11 +280,46 @@ class CartViewSet(viewsets.ModelViewSet):
 
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Несколько изменений корзины за один запрос: {"operations": [{"op": "add" | "update" | "remove", ...}]}.
+        Применяются в одной транзакции (ошибка в любой операции - корзина не меняется), в ответе - корзина целиком
+        """
+        try:
+            operations = parse_operations(request.data)
+        except CartBatchError as exc:
+            return Response({'error': str(exc), 'operation': exc.index}, status=exc.status)
+
+        # Корзина создается, только если в пакете есть добавление товара
+        if any(operation['op'] == 'add' for operation in operations):
+            cart = self.get_or_create_cart()
+        else:
+            cart = self.get_cart()
+            if cart is None:
+                return Response(
+                    {'error': f'Cart item with id {operations[0]["item_id"]} not found', 'operation': 0},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+
+        try:
+            apply_operations(cart, operations)
+        except CartBatchError as exc:
+            return Response({'error': str(exc), 'operation': exc.index}, status=exc.status)
+        except IntegrityError:
+            # Та же позиция одновременно добавлена другим запросом (add_item в соседней вкладке)
+            return Response(
+                {'error': 'Cart was changed concurrently, please retry'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return self.cart_response(cart)
+
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """Очистить корзину"""
-        cart = self.get_or_create_cart()
-        cart.items.all().delete()
+        cart = self.get_cart()
+        if cart is not None:
+            cart.items.all().delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
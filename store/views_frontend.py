@@ -1,7 +1,15 @@
 from django.shortcuts import render, get_object_or_404
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q
 from .models import Product, Category, Cart, CartItem
+from .search import is_ranked
+from .catalog import (
+    parse_filters, apply_filters, get_facet_counts,
+    get_sort, apply_sort, InvalidSort, DEFAULT_SORT, SORT_ORDERINGS
+)
+from .pagination import InvalidCursor, encode_cursor, get_ordering, paginate_keyset
+from .recommendations import get_related_products
+from .page_cache import anonymous_page_cache
+from .conditional import conditional, catalog_page_validators, product_page_validators
 
 
 def get_dummy_products():
@@ -104,11 +112,12 @@ def get_dummy_categories():
     ]
 
 
+@anonymous_page_cache('catalog')
 def index(request):
     """Главная страница"""
     from .models import HeroConfig
     # Получаем товары из БД, если есть - иначе заглушки
-    products = list(Product.objects.filter(is_active=True).order_by('-rating', '-reviews_count', '-created_at')[:8])
+    products = list(Product.objects.filter(is_active=True).order_by(*SORT_ORDERINGS['popularity'])[:8])
     if not products:
         products = get_dummy_products()
     
@@ -128,103 +137,80 @@ def index(request):
     return render(request, 'index.html', context)
 
 
+@conditional(catalog_page_validators)
+@anonymous_page_cache('catalog')
 def catalog(request):
     """Страница каталога"""
     # Получаем товары из БД
     products_queryset = Product.objects.filter(is_active=True)
     
-    # Фильтрация по категории
+    # Фильтры: категория, цена, размер, цвет, полнотекстовый поиск (общие с API)
+    filters = parse_filters(request.GET)
+    products_queryset = apply_filters(products_queryset, filters)
     category_slug = request.GET.get('category', None)
-    if category_slug:
-        products_queryset = products_queryset.filter(category__slug=category_slug)
-    
-    # Фильтрация по цене
     min_price = request.GET.get('min_price', None)
     max_price = request.GET.get('max_price', None)
-    if min_price:
-        try:
-            products_queryset = products_queryset.filter(price__gte=float(min_price))
-        except (ValueError, TypeError):
-            pass
-    if max_price:
-        try:
-            products_queryset = products_queryset.filter(price__lte=float(max_price))
-        except (ValueError, TypeError):
-            pass
-    
-    # Поиск
     search_query = request.GET.get('search', None)
-    if search_query:
-        products_queryset = products_queryset.filter(
-            Q(name__icontains=search_query) | Q(description__icontains=search_query)
-        )
-    
-    # Фильтрация по размеру
     size_filter = request.GET.get('size', None)
-    if size_filter:
-        # Ищем товары, у которых в available_sizes есть указанный размер
-        products_queryset = products_queryset.filter(
-            Q(available_sizes__icontains=size_filter)
-        )
-    
-    # Фильтрация по цвету
     color_filter = request.GET.get('color', None)
-    if color_filter:
-        # Маппинг цветов из hex в названия
-        color_map = {
-            '#000': 'Черный',
-            '#000000': 'Черный',
-            '#fff': 'Белый',
-            '#ffffff': 'Белый',
-            '#e74c3c': 'Красный',
-            '#3498db': 'Синий',
-            '#2ecc71': 'Зеленый',
-            '#f39c12': 'Желтый',
-        }
-        color_name = color_map.get(color_filter.lower(), color_filter)
-        # Ищем товары, у которых в available_colors есть указанный цвет
-        products_queryset = products_queryset.filter(
-            Q(available_colors__icontains=color_name)
-        )
     
-    # Сортировка
-    sort_by = request.GET.get('sort', 'newest')
+    # Сортировка: общий с API набор режимов (неизвестное значение - по новизне)
+    try:
+        sort_by = get_sort(request.GET)
+    except InvalidSort:
+        sort_by = DEFAULT_SORT
+    products_queryset = apply_sort(products_queryset, sort_by)
+    if sort_by is None:
+        # Без явной сортировки: при поиске - по релевантности (sort не передаем в ссылки пагинации)
+        sort_by = '' if is_ranked(products_queryset) else DEFAULT_SORT
     
-    # Применяем сортировку для реальных товаров из БД
-    if sort_by == 'popularity':
-        # По популярности: сначала по рейтингу, потом по количеству отзывов, потом по дате создания
-        products_queryset = products_queryset.order_by('-rating', '-reviews_count', '-created_at')
-    elif sort_by == 'price_low':
-        # По цене: от низкой к высокой
-        products_queryset = products_queryset.order_by('price', '-created_at')
-    elif sort_by == 'price_high':
-        # По цене: от высокой к низкой
-        products_queryset = products_queryset.order_by('-price', '-created_at')
-    elif sort_by == 'newest':
-        # По новизне: сначала новые
-        products_queryset = products_queryset.order_by('-created_at')
+    # Кортеж сортировки с завершающим id: одинаковый порядок для номеров страниц и курсора
+    ordering = get_ordering(products_queryset)
+    next_cursor_url = None
+    if 'cursor' in request.GET:
+        # Бесконечная прокрутка: keyset-пагинация без COUNT(*) и OFFSET
+        try:
+            products_page, next_cursor = paginate_keyset(products_queryset, request.GET.get('cursor'), 12)
+        except InvalidCursor:
+            # Курсор от другой сортировки или поврежден - начинаем с первой страницы
+            products_page, next_cursor = paginate_keyset(products_queryset, None, 12)
+        if next_cursor:
+            params = request.GET.copy()
+            params.pop('page', None)
+            params['cursor'] = next_cursor
+            next_cursor_url = f'{request.path}?{params.urlencode()}'
     else:
-        # По умолчанию: по новизне
-        products_queryset = products_queryset.order_by('-created_at')
-    
-    # Создаем пагинатор
-    paginator = Paginator(products_queryset, 12)  # 12 товаров на страницу
+        # Создаем пагинатор
+        paginator = Paginator(products_queryset, 12)  # 12 товаров на страницу
+        
+        page = request.GET.get('page', 1)
+        try:
+            products_page = paginator.page(page)
+        except PageNotAnInteger:
+            products_page = paginator.page(1)
+        except EmptyPage:
+            products_page = paginator.page(paginator.num_pages)
+        if products_page.has_next():
+            # Ссылка "Показать еще" продолжает текущую страницу курсором от ее последнего товара
+            params = request.GET.copy()
+            params.pop('page', None)
+            params['cursor'] = encode_cursor(products_page[-1], ordering)
+            next_cursor_url = f'{request.path}?{params.urlencode()}'
     
-    page = request.GET.get('page', 1)
-    try:
-        products_page = paginator.page(page)
-    except PageNotAnInteger:
-        products_page = paginator.page(1)
-    except EmptyPage:
-        products_page = paginator.page(paginator.num_pages)
+    # Количество товаров по значениям фильтров (один агрегирующий запрос, кэшируется)
+    facets = get_facet_counts(filters)
+    category_counts = {item['slug']: item['count'] for item in facets['categories']}
     
     # Получаем категории из БД
     categories = list(Category.objects.all().order_by('name'))
+    for category in categories:
+        category.facet_count = category_counts.get(category.slug, 0)
     if not categories:
         categories = get_dummy_categories()
     
     context = {
         'products': products_page,
+        'next_cursor_url': next_cursor_url,
         'categories': categories,
         'current_category': category_slug,
         'current_sort': sort_by,
@@ -233,10 +219,16 @@ def catalog(request):
         'max_price': max_price,
         'current_size': size_filter,
         'current_color': color_filter,
+        'facets': facets,
+        'size_counts': {item['value']: item['count'] for item in facets['sizes']},
+        'color_counts': {item['value']: item['count'] for item in facets['colors']},
+        'price_counts': {str(item['min']): item['count'] for item in facets['price_buckets']},
     }
     return render(request, 'catalog.html', context)
 
 
+@conditional(product_page_validators)
+@anonymous_page_cache('catalog')
 def product_detail(request, slug=None):
     """Страница товара"""
     product = None
@@ -247,15 +239,8 @@ def product_detail(request, slug=None):
         try:
             product = Product.objects.prefetch_related('images').get(slug=slug, is_active=True)
             
-            # Получаем связанные товары из той же категории
-            if product.category:
-                related_products = Product.objects.filter(
-                    category=product.category,
-                    is_active=True
-                ).exclude(id=product.id)[:4]
-            else:
-                # Если нет категории, берем любые активные товары
-                related_products = Product.objects.filter(is_active=True).exclude(id=product.id)[:4]
+            # Похожие товары: готовый список по совместным покупкам (команда build_related_products)
+            related_products = get_related_products(product, limit=4)
         except Product.DoesNotExist:
             pass
     
@@ -347,14 +332,9 @@ def product_detail(request, slug=None):
 
 def cart(request):
     """Страница корзины"""
-    # Получаем или создаем корзину для текущей сессии
-    session_key = request.session.session_key
-    if not session_key:
-        request.session.create()
-        session_key = request.session.session_key
-    
-    cart, created = Cart.objects.get_or_create(session_key=session_key)
-    cart_items = CartItem.objects.filter(cart=cart).select_related('product')
+    # Корзина текущей сессии; если товаров еще не добавляли - пустая страница без создания сессии и корзины
+    cart = Cart.get_for_session(request.session)
+    cart_items = CartItem.objects.filter(cart=cart).select_related('product') if cart is not None else []
     
     context = {
         'cart': cart,
@@ -363,6 +343,7 @@ def cart(request):
     return render(request, 'cart.html', context)
 
 
+@anonymous_page_cache('about')
 def about(request):
     """Страница о нас"""
     from .models import AboutConfig
@@ -378,11 +359,13 @@ def contact(request):
     return render(request, 'contact.html')
 
 
+@anonymous_page_cache()
 def delivery(request):
     """Страница доставки"""
     return render(request, 'delivery.html')
 
 
+@anonymous_page_cache('faq')
 def faq(request):
     """Страница часто задаваемых вопросов"""
     from .models import FAQ